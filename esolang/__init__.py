@@ -1,5 +1,5 @@
-from .esolang import Esolang
+async def setup(bot):
+    # Imported here, so that the interpreters can be used without Red, e.g. by the benchmark
+    from .esolang import Esolang
 
-
-def setup(bot):
-    bot.add_cog(Esolang(bot))
+    await bot.add_cog(Esolang(bot))
@@ -1,19 +1,16 @@
-from typing import List
-from enum import Enum
+from typing import Callable, Dict, List, TextIO, Tuple
+from array import array
 import random
 import io
 
-
-# Utility
-class Mode(Enum):
-    LITERAL = 1
-    STRING = 2
+from .memory import Memory
 
 
+# Utility
 class Point:
-    def __init__(self):
-        self.x = 0
-        self.y = 0
+    def __init__(self, x: int = 0, y: int = 0):
+        self.x = x
+        self.y = y
 
     def move(self, direction: List[int]) -> None:
         self.x += direction[0]
@@ -22,6 +19,8 @@ class Point:
 
 DIRECTIONS = [[1, 0], [0, 1], [-1, 0], [0, -1]]
 
+DEFAULT_BUDGET = 10_000_000
+
 
 # Exceptions
 class EmptyStack(SyntaxError):
@@ -34,6 +33,16 @@ class EmptyStack(SyntaxError):
         )
 
 
+class DivisionByZero(SyntaxError):
+    """Raised when the top of the stack is zero in a division or modulo"""
+
+    def __init__(self, message: str, codemap: List[List[str]], position: Point):
+        super().__init__(
+            message,
+            ("program.befunge", position.y + 1, position.x + 1, "".join(codemap[position.y])),
+        )
+
+
 class UnknownSymbol(SyntaxError):
     def __init__(self, message: str, codemap: List[List[str]], position: Point):
         super().__init__(
@@ -55,6 +64,149 @@ class NoTermination(SyntaxError):
         )
 
 
+# Opcodes
+# Every cell of the playfield is compiled into one of these.  Control flow is handled inline by
+# the engine, while the stack manipulating opcodes are looked up in HANDLERS.
+NOP = 0
+RIGHT = 1
+DOWN = 2
+LEFT = 3
+UP = 4
+RANDOM = 5
+HORIZONTAL_IF = 6
+VERTICAL_IF = 7
+BRIDGE = 8
+STRING = 9
+END = 10
+OUTPUT_NUMBER = 11
+OUTPUT_CHAR = 12
+GET = 13
+PUT = 14
+UNKNOWN = 15
+ADDITION = 16
+SUBTRACTION = 17
+MULTIPLICATION = 18
+DIVISION = 19
+MODULO = 20
+LOGICAL_NOT = 21
+GREATER = 22
+DUPLICATE = 23
+SWAP = 24
+DISCARD = 25
+DIGIT = 26  # DIGIT + n pushes n
+
+DELTAS = {RIGHT: (1, 0), DOWN: (0, 1), LEFT: (-1, 0), UP: (0, -1)}
+
+OPCODES = {
+    " ": NOP,
+    ">": RIGHT,
+    "v": DOWN,
+    "<": LEFT,
+    "^": UP,
+    "?": RANDOM,
+    "_": HORIZONTAL_IF,
+    "|": VERTICAL_IF,
+    "#": BRIDGE,
+    '"': STRING,
+    "@": END,
+    ".": OUTPUT_NUMBER,
+    ",": OUTPUT_CHAR,
+    "g": GET,
+    "p": PUT,
+    "+": ADDITION,
+    "-": SUBTRACTION,
+    "*": MULTIPLICATION,
+    "/": DIVISION,
+    "%": MODULO,
+    "!": LOGICAL_NOT,
+    "`": GREATER,
+    ":": DUPLICATE,
+    "\\": SWAP,
+    "$": DISCARD,
+}
+OPCODES.update({str(n): DIGIT + n for n in range(10)})
+
+
+# Stack handlers
+# These work on the raw list and let IndexError and ZeroDivisionError propagate, which the
+# engine turns into EmptyStack and DivisionByZero using the name in HANDLER_NAMES.
+
+
+def _addition(stack: List[int]) -> None:
+    stack.append(stack.pop() + stack.pop())
+
+
+def _subtraction(stack: List[int]) -> None:
+    a = stack.pop()
+    stack.append(stack.pop() - a)
+
+
+def _multiplication(stack: List[int]) -> None:
+    stack.append(stack.pop() * stack.pop())
+
+
+def _division(stack: List[int]) -> None:
+    a = stack.pop()
+    stack.append(stack.pop() // a)
+
+
+def _modulo(stack: List[int]) -> None:
+    a = stack.pop()
+    stack.append(stack.pop() % a)
+
+
+def _lnot(stack: List[int]) -> None:
+    stack.append(1 if stack.pop() == 0 else 0)
+
+
+def _greater(stack: List[int]) -> None:
+    a, b = stack.pop(), stack.pop()
+    stack.append(1 if b > a else 0)
+
+
+def _duplicate(stack: List[int]) -> None:
+    if not stack:
+        stack.append(0)
+    stack.append(stack[-1])
+
+
+def _swap(stack: List[int]) -> None:
+    a = stack.pop()
+    b = stack.pop() if stack else 0
+    stack.append(a)
+    stack.append(b)
+
+
+def _discard(stack: List[int]) -> None:
+    stack.pop()
+
+
+HANDLERS: Tuple[Callable[[List[int]], None], ...] = (None,) * ADDITION + (
+    _addition,
+    _subtraction,
+    _multiplication,
+    _division,
+    _modulo,
+    _lnot,
+    _greater,
+    _duplicate,
+    _swap,
+    _discard,
+)
+
+HANDLER_NAMES = {
+    ADDITION: "addition",
+    SUBTRACTION: "subtraction",
+    MULTIPLICATION: "multiplication",
+    DIVISION: "division",
+    MODULO: "modulo",
+    LOGICAL_NOT: "logical not",
+    GREATER: "logical greater",
+    SWAP: "swap",
+    DISCARD: "pop",
+}
+
+
 # Core classes
 
 
@@ -67,105 +219,12 @@ class Stack:
     def push(self, value: int) -> None:
         self._internal.append(value)
 
-    def __pop(self) -> int:
-        return self._internal.pop()
-
     def pop(self) -> int:
         try:
-            return self.__pop()
+            return self._internal.pop()
         except IndexError:
             raise EmptyStack("Empty stack in pop call", self.codemap, self.pointer)
 
-    def addition(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in addition call", self.codemap, self.pointer)
-        self.push(a + b)
-
-    def subtraction(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in subtraction call", self.codemap, self.pointer)
-        self.push(a - b)
-
-    def multiplication(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in multiplication call", self.codemap, self.pointer)
-        self.push(a * b)
-
-    def division(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in division call", self.codemap, self.pointer)
-        self.push(a // b)
-
-    def modulo(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in modulo call", self.codemap, self.pointer)
-        self.push(a % b)
-
-    def lnot(self) -> None:
-        try:
-            a = self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in logical not call", self.codemap, self.pointer)
-        self.push(1 if a == 0 else 0)
-
-    def greater(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in logical greater call", self.codemap, self.pointer)
-        self.push(1 if b > a else 0)
-
-    def underscore(self) -> List[int]:
-        try:
-            a = self.__pop()
-        except IndexError:
-            a = 0
-        if a == 0:
-            return [1, 0]
-        else:
-            return [-1, 0]
-
-    def pipe(self) -> List[int]:
-        try:
-            a = self.__pop()
-        except IndexError:
-            a = 0
-        if a == 0:
-            return [0, 1]
-        else:
-            return [0, -1]
-
-    def duplicate(self) -> None:
-        try:
-            a = self.__pop()
-        except IndexError:
-            a = 0
-        self.push(a)
-        self.push(a)
-
-    def swap(self) -> None:
-        try:
-            a = self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in swap call", self.codemap, self.pointer)
-
-        try:
-            b = self.__pop()
-        except IndexError:
-            b = 0
-        self.push(a)
-        self.push(b)
-
 
 class Befunge:
     @staticmethod
@@ -175,6 +234,51 @@ class Befunge:
         if code.count('"') % 2 != 0:
             raise NoTermination("Program has an un-ending stringmode segment", code)
 
+    @staticmethod
+    def deterministic(code: str) -> bool:
+        """Whether the program always gives the same result.
+
+        Every path the instruction pointer could take is followed from the start, going both
+        ways at ``_`` and ``|``.  ``?`` is random, and ``p`` could write a ``?`` while running,
+        so reaching either one makes the program count as random.  Characters inside strings
+        are only pushed, so a ``p`` in ``"hello, player"`` does not count."""
+        codemap = Befunge.buildcodemap(code)
+        if not codemap:
+            return False
+        opcodes, _ = Befunge.compile(codemap)
+        height, width = len(codemap), len(codemap[0])
+        seen = set()
+        pending = [(0, 0, RIGHT, False)]
+        while pending:
+            state = pending.pop()
+            if state in seen:
+                continue
+            seen.add(state)
+            x, y, direction, string_mode = state
+            op = opcodes[y * width + x]
+            if string_mode:
+                string_mode = op != STRING
+            elif op == RANDOM or op == PUT:
+                return False
+            elif op == END or op == UNKNOWN:
+                continue  # Runs that end in an error are never cached
+            elif op == STRING:
+                string_mode = True
+            elif RIGHT <= op <= UP:
+                direction = op
+            directions = [direction]
+            if not string_mode and op == HORIZONTAL_IF:
+                directions = [RIGHT, LEFT]
+            elif not string_mode and op == VERTICAL_IF:
+                directions = [DOWN, UP]
+            steps = 2 if op == BRIDGE and not string_mode else 1
+            for direction in directions:
+                dx, dy = DELTAS[direction]
+                pending.append(
+                    ((x + dx * steps) % width, (y + dy * steps) % height, direction, string_mode)
+                )
+        return True
+
     @staticmethod
     def buildcodemap(code: str) -> List[List[str]]:
         codemap = code.split("\n")
@@ -198,116 +302,115 @@ class Befunge:
         return codemap
 
     @staticmethod
-    async def evaluate(code: str) -> io.StringIO:
-        Befunge.check_syntax(code)
-
-        codemap: List[List[str]] = Befunge.buildcodemap(code)
-        pointer: Point = Point()
-        stack: Stack = Stack(codemap, pointer)
+    def compile(codemap: List[List[str]]) -> Tuple[array, List[int]]:
+        """Flatten the playfield row by row into arrays of opcodes and raw character codes.
 
-        mode: int = Mode.LITERAL
-        direction: List[int] = [1, 0]
-        output = io.StringIO("")
-        skip_next = False
-        counter: int = 0
+        The character codes are needed for string mode and ``g``.  They are kept in a plain
+        list since ``p`` may store any integer in a cell."""
+        cells = [char for row in codemap for char in row]
+        opcodes = array("B", [OPCODES.get(char, UNKNOWN) for char in cells])
+        characters = [ord(char) for char in cells]
+        return opcodes, characters
 
-        while counter < 100000:
-            try:
-                assert pointer.y > -1
-                row: List[str] = codemap[pointer.y]
-            except (IndexError, AssertionError):
-                if pointer.y == -1 and direction[1] == 1:
-                    pointer.y += 1
-                    continue
-                elif pointer.y == -1 and direction[1] == -1:
-                    pointer.y = len(codemap) - 1
-                    continue
-                elif pointer.y == len(codemap) and direction[1] == 1:
-                    pointer.y = 0
-                    continue
-                elif pointer.y == len(codemap) and direction[1] == -1:
-                    pointer.y = len(codemap) - 1
-                    continue
+    @staticmethod
+    def decode(value: int) -> int:
+        """Return the opcode for a value stored in the playfield by ``p``"""
+        try:
+            return OPCODES.get(chr(value), UNKNOWN)
+        except (ValueError, OverflowError):
+            return UNKNOWN
 
-            try:
-                assert pointer.x > -1
-                char: str = row[pointer.x]
-            except (IndexError, AssertionError):
-                if pointer.x == -1 and direction[0] == 1:
-                    pointer.x += 1
-                    continue
-                elif pointer.x == -1 and direction[0] == -1:
-                    pointer.x = len(row) - 1
-                    continue
-                elif pointer.x == len(row) and direction[0] == 1:
-                    pointer.x = 0
-                    continue
-                elif pointer.x == len(row) and direction[0] == -1:
-                    pointer.x = len(row) - 1
-                    continue
-
-            if skip_next:
-                pointer.move(direction)
-                skip_next = False
-                continue
+    @staticmethod
+    def evaluate(
+        code: str,
+        budget: int = DEFAULT_BUDGET,
+        stats: dict = None,
+        output: TextIO = None,
+        profile=None,
+    ) -> Tuple[TextIO, Memory]:
+        Befunge.check_syntax(code)
 
-            if mode == Mode.LITERAL:
-                if char == ">":
-                    direction = [1, 0]
-                elif char == "<":
-                    direction = [-1, 0]
-                elif char == "^":
-                    direction = [0, -1]
-                elif char == "v":
-                    direction = [0, 1]
-                elif char == "?":
-                    direction = random.choice(DIRECTIONS)
-                elif char == "+":
-                    stack.addition()
-                elif char == "-":
-                    stack.subtraction()
-                elif char == "*":
-                    stack.multiplication()
-                elif char == "/":
-                    stack.division()
-                elif char == "%":
-                    stack.modulo()
-                elif char == "!":
-                    stack.lnot()
-                elif char == "`":
-                    stack.greater()
-                elif char == "_":
-                    direction = stack.underscore()
-                elif char == "|":
-                    direction = stack.pipe()
-                elif char == ":":
-                    stack.duplicate()
-                elif char == "\\":
-                    stack.swap()
-                elif char == "$":
-                    stack.pop()
-                elif char == ".":
-                    output.write(str(stack.pop()))
-                    output.write(" ")
-                elif char == ",":
-                    output.write(chr(stack.pop()))
-                elif char == "#":
-                    skip_next = True
-                elif char == "@":
-                    return output, stack._internal
-                elif char == '"':
-                    mode = Mode.STRING
-                elif char == " ":
-                    pass
-                elif char.isdigit():
-                    stack.push(int(char))
+        codemap: List[List[str]] = Befunge.buildcodemap(code)
+        opcodes, characters = Befunge.compile(codemap)
+        if profile is not None:
+            opcodes = profile.watch_program(opcodes)
+        height, width = len(codemap), len(codemap[0])
+        stack: Stack = Stack(codemap, Point())
+        values: List[int] = stack._internal
+        push = values.append
+
+        # Cells outside of the program can still be used as storage by g and p, but are
+        # never executed since the instruction pointer wraps around the program itself.
+        storage: Dict[Tuple[int, int], int] = {}
+        if output is None:
+            output = io.StringIO()
+        write = output.write
+        string_mode = False
+        x, y, dx, dy = 0, 0, 1, 0
+        position, steps = 0, budget
+
+        for counter in range(budget):
+            op = opcodes[position]
+            if string_mode:
+                if op == STRING:
+                    string_mode = False
                 else:
-                    raise UnknownSymbol(char, codemap, pointer)
-            elif mode == Mode.STRING:
-                if char == '"':
-                    mode = Mode.LITERAL
+                    push(characters[position])
+            elif op >= DIGIT:
+                push(op - DIGIT)
+            elif op >= ADDITION:
+                try:
+                    HANDLERS[op](values)
+                except IndexError:
+                    stack.pointer = Point(x, y)
+                    raise EmptyStack(
+                        f"Empty stack in {HANDLER_NAMES[op]} call", codemap, stack.pointer
+                    )
+                except ZeroDivisionError:
+                    stack.pointer = Point(x, y)
+                    raise DivisionByZero(
+                        f"Division by zero in {HANDLER_NAMES[op]} call", codemap, stack.pointer
+                    )
+            elif op == NOP:
+                pass
+            elif op <= UP:
+                dx, dy = DELTAS[op]
+            elif op == HORIZONTAL_IF:
+                dx, dy = (1 if not values or values.pop() == 0 else -1), 0
+            elif op == VERTICAL_IF:
+                dx, dy = 0, (1 if not values or values.pop() == 0 else -1)
+            elif op == BRIDGE:
+                x, y = (x + dx) % width, (y + dy) % height
+            elif op == RANDOM:
+                dx, dy = random.choice(DIRECTIONS)
+            elif op == STRING:
+                string_mode = True
+            elif op == OUTPUT_NUMBER or op == OUTPUT_CHAR:
+                stack.pointer = Point(x, y)
+                value = stack.pop()
+                write(f"{value} " if op == OUTPUT_NUMBER else chr(value))
+            elif op == GET or op == PUT:
+                stack.pointer = Point(x, y)
+                row, column = stack.pop(), stack.pop()
+                inside = 0 <= column < width and 0 <= row < height
+                if op == GET:
+                    if inside:
+                        push(characters[row * width + column])
+                    else:
+                        push(storage.get((column, row), 32))
+                elif inside:
+                    value = stack.pop()
+                    characters[row * width + column] = value
+                    opcodes[row * width + column] = Befunge.decode(value)
                 else:
-                    stack.push(ord(char))
-            pointer.move(direction)
-            counter += 1
-        return output, stack._internal
+                    storage[(column, row)] = stack.pop()
+            elif op == END:
+                steps = counter
+                break
+            else:
+                raise UnknownSymbol(codemap[y][x], codemap, Point(x, y))
+            x, y = (x + dx) % width, (y + dy) % height
+            position = y * width + x
+        if stats is not None:
+            stats["steps"] = steps
+        return output, Memory(values, len(values) - 1, "stack")
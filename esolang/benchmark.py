@@ -0,0 +1,183 @@
+"""Benchmark and conformance suite for the interpreters.
+
+Every program in the corpus folder is run, and its output compared against the golden file next
+to it.  Run it from the folder containing the cog with::
+
+    python -m esolang.benchmark [--baseline FILE] [--save-baseline FILE]
+
+A program is picked up when it has a known extension and its expected output is stored next to
+it with ``.out`` appended to the file name, e.g. ``primes.bf.out``.  If a ``.in`` file exists
+as well, it is given to the program as input.  Throughput is reported in interpreted
+instructions per second.  Throughput depends on the machine, so it is only checked when a
+baseline is given: record one with ``--save-baseline`` on the machine you benchmark on, and
+the run then fails if any program got slower than it by more than the tolerance.  The
+``baseline.json`` in the corpus folder was recorded on a development machine and is only there
+for reference.
+
+The corpus has no ``mandelbrot.bf``.  The well-known one runs for billions of instructions,
+far too long for an interpreter written in Python to run on every benchmark, and no small
+variant with a clear licence was at hand.  The prime sieves are the heaviest Brainfuck and COW
+programs instead."""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .befunge import Befunge
+from .brainfuck import Brainfuck
+from .cow import COW
+from .whitespace import Whitespace
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def _output(result) -> str:
+    # Brainfuck, COW and Befunge also return their memory alongside the output
+    if isinstance(result, tuple):
+        result = result[0]
+    return result.getvalue()
+
+
+LANGUAGES: Dict[str, Callable[[str, str, dict], str]] = {
+    ".bf": lambda code, stdin, stats: _output(Brainfuck.evaluate(code, stats)),
+    ".cow": lambda code, stdin, stats: _output(COW.evaluate(code, stats)),
+    ".befunge": lambda code, stdin, stats: _output(Befunge.evaluate(code, stats=stats)),
+    ".ws": lambda code, stdin, stats: _output(Whitespace.evaluate(code, stdin, stats)),
+}
+
+
+class Program(NamedTuple):
+    name: str
+    run: Callable[[str, str, dict], str]
+    code: str
+    stdin: str
+    expected: str
+
+
+class Result(NamedTuple):
+    name: str
+    passed: bool
+    steps: int
+    seconds: float
+    peak: int
+
+    @property
+    def rate(self) -> float:
+        return self.steps / self.seconds if self.seconds else 0.0
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def load_corpus(folder: str = CORPUS, pattern: str = "") -> List[Program]:
+    programs = []
+    for filename in sorted(os.listdir(folder)):
+        extension = os.path.splitext(filename)[1]
+        if extension not in LANGUAGES or pattern not in filename:
+            continue
+        path = os.path.join(folder, filename)
+        if not os.path.exists(path + ".out"):
+            continue
+        stdin = _read(path + ".in") if os.path.exists(path + ".in") else ""
+        programs.append(
+            Program(filename, LANGUAGES[extension], _read(path), stdin, _read(path + ".out"))
+        )
+    return programs
+
+
+def measure(program: Program, repeat: int = 3, minimum: float = 0.05) -> Result:
+    """Time a program ``repeat`` times and keep the fastest time.
+
+    Short programs are run in a loop until each timing takes at least ``minimum`` seconds, so
+    that their throughput is not just noise.  Peak memory comes from one extra run under
+    tracemalloc, since tracing slows the interpreters down too much to be timed at the same
+    time."""
+    stats = {}
+    start = time.perf_counter()
+    output = program.run(program.code, program.stdin, stats)
+    best = time.perf_counter() - start
+    number = max(1, int(minimum / best)) if best else 1000
+    for _ in range(max(repeat, 1) - 1 if number == 1 else max(repeat, 1)):
+        start = time.perf_counter()
+        for _ in range(number):
+            program.run(program.code, program.stdin, {})
+        best = min(best, (time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    try:
+        program.run(program.code, program.stdin, {})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return Result(program.name, output == program.expected, stats.get("steps", 0), best, peak)
+
+
+def regressions(results: List[Result], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    slower = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous and result.rate < previous * (1 - tolerance):
+            slower.append(
+                f"{result.name}: {result.rate:,.0f} instructions/s, "
+                f"baseline {previous:,.0f} ({result.rate / previous - 1:+.0%})"
+            )
+    return slower
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m esolang.benchmark", description="Benchmark the esolang interpreters."
+    )
+    parser.add_argument("--corpus", default=CORPUS, help="folder containing the programs")
+    parser.add_argument("--filter", default="", help="only run programs containing this text")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per program")
+    parser.add_argument(
+        "--baseline", help="JSON file with instructions per second to compare against"
+    )
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed slowdown, as a fraction"
+    )
+    args = parser.parse_args(argv)
+
+    programs = load_corpus(args.corpus, args.filter)
+    if not programs:
+        print("No programs found", file=sys.stderr)
+        return 1
+
+    header = f"{'Program':<18}{'Result':<8}{'Steps':>12}{'Time (s)':>11}{'Instr/s':>14}"
+    print(header + f"{'Peak (KiB)':>12}")
+    results = []
+    for program in programs:
+        result = measure(program, args.repeat)
+        results.append(result)
+        print(
+            f"{result.name:<18}{'ok' if result.passed else 'FAIL':<8}{result.steps:>12,}"
+            f"{result.seconds:>11.4f}{result.rate:>14,.0f}{result.peak / 1024:>12,.1f}"
+        )
+
+    failed = [result.name for result in results if not result.passed]
+    if failed:
+        print(f"\nOutput differs from the golden file: {', '.join(failed)}")
+
+    slower = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        if slower:
+            print("\nThroughput regressions:\n" + "\n".join(slower))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({result.name: round(result.rate) for result in results}, f, indent=4)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+    return 1 if failed or slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,28 @@
 import io
+import math
+from itertools import count
+
+from .memory import Memory
+
+# Opcodes emitted by Brainfuck.compile
+ADD = 0  # arg: amount to add to the current cell, mod 256
+MOVE = 1  # arg: signed pointer offset (runs are only folded in one direction)
+OPEN = 2  # arg: index of the matching CLOSE
+CLOSE = 3  # arg: index of the matching OPEN
+OUTPUT = 4
+CLEAR = 5  # arg: None for [-] and [+], or the step a [++] style loop needs the cell to divide
+SCAN = 6  # arg: pointer step, for [>] / [<<] style loops
+MULTIPLY = 7  # arg: (((offset, factor), ...), lowest offset, highest offset, loop end)
+STALL = 8  # arg: lowest offset of a loop body that never changes the current cell, e.g. []
+
+HALT = 9  # appended to every program, so the engine loop needs no bounds check
+
+# Opcodes only emitted by COW.compile
+REGISTER = 10  # MMM
+OUTPUT_NUMBER = 11  # OOM
+EXECUTE = 12  # mOO, always followed by a slot it fills with the instruction to run
+
+TAPE_SIZE = 30000
 
 
 class Brainfuck:
@@ -17,50 +41,244 @@ class Brainfuck:
             if command == "[":
                 temp_bracestack.append(position)
             elif command == "]":
+                if not temp_bracestack:
+                    lines = Brainfuck.getlines(code)
+                    raise SyntaxError(
+                        "Unmatched ]", ("program.bf", position // 50 + 1, position % 50, lines[-1])
+                    )
                 start = temp_bracestack.pop()
                 bracemap[start] = position
                 bracemap[position] = start
+        if temp_bracestack:
+            lines = Brainfuck.getlines(code)
+            raise SyntaxError("Trailing [", ("program.bf", len(lines), len(lines[-1]), lines[-1]))
         return bracemap
 
     @staticmethod
-    def evaluate(code):
-        code = Brainfuck.cleanup(list(code))
-        bracemap = Brainfuck.buildbracemap(code)
-        cells, codeptr, cellptr, prev = [0], 0, 0, -1
-
-        output = io.StringIO("")
-
-        while codeptr < len(code):
-            command = code[codeptr]
-            if command == ">":
-                cellptr += 1
-                if cellptr == len(cells):
-                    cells.append(0)
-            elif command == "<":
-                cellptr = 0 if cellptr <= 0 else cellptr - 1
-            elif command == "+":
-                cells[cellptr] = cells[cellptr] + 1 if cells[cellptr] < 255 else 0
-            elif command == "-":
-                cells[cellptr] = cells[cellptr] - 1 if cells[cellptr] > 0 else 255
+    def optimize_loop(body):
+        """Replace a loop body made only of ADD and MOVE with a single instruction.
+
+        Returns ``None`` if the loop has to be run as-is."""
+        if any(op not in (ADD, MOVE) for op, arg in body):
+            return None
+        if len(body) == 1:
+            op, arg = body[0]
+            if op == ADD:
+                # An odd step walks through every value, so the loop always ends at 0.  An even
+                # step only reaches 0 from multiples of its common factor with 256.
+                return CLEAR, (None if arg % 2 else math.gcd(arg, 256))
+            return SCAN, arg
+
+        offset, lowest, highest, changes = 0, 0, 0, {}
+        for op, arg in body:
+            if op == MOVE:
+                offset += arg
+                lowest = min(lowest, offset)
+                highest = max(highest, offset)
+            else:
+                changes[offset] = (changes.get(offset, 0) + arg) % 256
+        if offset != 0:
+            return None
+        step = changes.pop(0, 0)
+        if step == 0:
+            return STALL, lowest
+        if step not in (1, 255):
+            return None
+        # Every iteration moves the current cell one step towards 0, so the
+        # number of iterations is either the cell itself or its complement.
+        factors = tuple(
+            (off, factor if step == 255 else -factor % 256)
+            for off, factor in changes.items()
+            if factor
+        )
+        return MULTIPLY, (factors, lowest, highest)
+
+    @staticmethod
+    def close_loop(program, positions, opener, position):
+        """Close the loop opened at index ``opener``, optimizing it if possible."""
+        optimized = Brainfuck.optimize_loop(program[opener + 1 :])
+        if optimized is not None and optimized[0] in (CLEAR, SCAN):
+            del program[opener:], positions[opener:]
+            program.append(optimized)
+            positions.append(position)
+            return
+        if optimized is not None:
+            # MULTIPLY and STALL are placed in front of the loop they replace.  The original
+            # loop is kept as a fallback for when a negative offset would hit the left edge
+            # of the tape, where moves clamp instead of wrapping.
+            program.insert(opener, None)
+            positions.insert(opener, positions[opener])
+            opener += 1
+        program.append((CLOSE, opener))
+        positions.append(position)
+        program[opener] = (OPEN, len(program) - 1)
+        if optimized is not None and optimized[0] == MULTIPLY:
+            program[opener - 1] = (MULTIPLY, optimized[1] + (len(program) - 1,))
+        elif optimized is not None:
+            program[opener - 1] = optimized
+
+    @staticmethod
+    def compile(code):
+        """Compile cleaned source into a list of ``(opcode, argument)`` pairs.
+
+        Also returns the source position each instruction came from, for error reporting."""
+        program, positions, openers = [], [], []
+        index, length = 0, len(code)
+        while index < length:
+            command = code[index]
+            start = index
+            if command in "+-":
+                delta = 0
+                while index < length and code[index] in "+-":
+                    delta += 1 if code[index] == "+" else -1
+                    index += 1
+                delta %= 256
+                if delta:
+                    program.append((ADD, delta))
+                    positions.append(start)
+                continue
+            elif command in "<>":
+                while index < length and code[index] == command:
+                    index += 1
+                program.append((MOVE, index - start if command == ">" else start - index))
+                positions.append(start)
+                continue
+            elif command == ".":
+                program.append((OUTPUT, None))
+                positions.append(start)
             elif command == "[":
-                if cells[cellptr] == 0:
-                    codeptr = bracemap[codeptr]
-                else:
-                    prev = cells[cellptr]
+                openers.append(len(program))
+                program.append((OPEN, None))
+                positions.append(start)
             elif command == "]":
-                if cells[cellptr] == 0:
-                    prev = 0
+                if not openers:
+                    Brainfuck.buildbracemap(code)
+                Brainfuck.close_loop(program, positions, openers.pop(), start)
+            index += 1
+        if openers:
+            Brainfuck.buildbracemap(code)
+        return program, positions
+
+    @staticmethod
+    def infinite_loop(code, position):
+        lines = Brainfuck.getlines(code)
+        return SyntaxError(
+            "Infinite loop: []", ("program.bf", len(lines), position % 50, lines[-1])
+        )
+
+    @staticmethod
+    def evaluate(code, stats=None, output=None, profile=None):
+        code = Brainfuck.cleanup(list(code))
+        program, positions = Brainfuck.compile(code)
+        return Brainfuck.run(
+            program,
+            lambda pc: Brainfuck.infinite_loop(code, positions[pc]),
+            stats,
+            output,
+            profile,
+        )
+
+    @staticmethod
+    def run(program, loop_error, stats=None, output=None, profile=None, execute=None):
+        """Run compiled instructions, for Brainfuck and COW alike.
+
+        ``loop_error(pc)`` builds the error raised for a loop that can never end.  COW also
+        passes ``execute(value, ptr, pc)``, which returns the instruction mOO runs for a cell."""
+        tape = bytearray(TAPE_SIZE)
+        size, pc, ptr, highest, registry = TAPE_SIZE, 0, 0, 0, -1
+
+        if output is None:
+            output = io.StringIO()
+        write = output.write
+
+        program.append((HALT, None))
+        if profile is not None:
+            program, tape = profile.watch_program(program), profile.watch_tape(tape)
+        for steps in count():
+            op, arg = program[pc]
+            if op == ADD:
+                tape[ptr] = (tape[ptr] + arg) & 255
+            elif op == MOVE:
+                ptr += arg
+                if ptr < 0:
+                    # Moves are only folded in one direction, so clamping the whole run at the
+                    # edge gives the same result as clamping every single step.
+                    ptr = 0
+                elif ptr >= size:
+                    tape.extend(bytes(ptr + 1))
+                    size = len(tape)
+                if ptr > highest:
+                    highest = ptr
+            elif op == OPEN:
+                if not tape[ptr]:
+                    pc = arg
+            elif op == CLOSE:
+                if tape[ptr]:
+                    pc = arg
+            elif op == CLEAR:
+                if arg and tape[ptr] % arg:
+                    raise loop_error(pc)
+                tape[ptr] = 0
+            elif op == MULTIPLY:
+                value = tape[ptr]
+                factors, lowest, reach, after = arg
+                if not value:
+                    pc = after
+                elif ptr + lowest >= 0:
+                    if ptr + reach >= size:
+                        tape.extend(bytes(ptr + reach + 1))
+                        size = len(tape)
+                    for offset, factor in factors:
+                        tape[ptr + offset] = (tape[ptr + offset] + value * factor) & 255
+                    tape[ptr] = 0
+                    if ptr + reach > highest:
+                        highest = ptr + reach
+                    pc = after
+            elif op == OUTPUT:
+                write(chr(tape[ptr]))
+            elif op == SCAN:
+                if arg == 1:
+                    found = tape.find(0, ptr)
+                    if found == -1:
+                        found = size
+                        tape.extend(bytes(size))
+                        size = len(tape)
+                    ptr = found
+                elif arg == -1:
+                    found = tape.rfind(0, 0, ptr + 1)
+                    if found == -1:
+                        raise loop_error(pc)
+                    ptr = found
                 else:
-                    if cells[cellptr] == prev:
-                        lines = Brainfuck.getlines("".join(code))
-                        errorptr = codeptr % 50
-                        raise SyntaxError(
-                            f"Infinite loop: []", ("program.bf", len(lines), errorptr, lines[-1])
-                        )
-                    else:
-                        codeptr = bracemap[codeptr]
-            elif command == ".":
-                output.write(chr(cells[cellptr]))
+                    while tape[ptr]:
+                        ptr += arg
+                        if ptr < 0:
+                            if tape[0]:
+                                raise loop_error(pc)
+                            ptr = 0
+                        elif ptr >= size:
+                            tape.extend(bytes(ptr + 1))
+                            size = len(tape)
+                if ptr > highest:
+                    highest = ptr
+            elif op == STALL:
+                if tape[ptr] and ptr + arg >= 0:
+                    raise loop_error(pc)
+            elif op == HALT:
+                break
+            elif op == EXECUTE:
+                # Brainfuck never gets here, so checking for mOO last costs it nothing
+                program[pc + 1] = execute(tape[ptr], ptr, pc)
+            elif op == OUTPUT_NUMBER:
+                write(str(tape[ptr]))
+            elif op == REGISTER:
+                if registry == -1:
+                    registry = tape[ptr]
+                else:
+                    tape[ptr] = registry
+                    registry = -1
 
-            codeptr += 1
-        return output, cells
+            pc += 1
+        if stats is not None:
+            stats["steps"] = steps
+        return output, Memory(bytes(tape[: highest + 1]), ptr)
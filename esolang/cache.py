@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+class ResultCache:
+    """Least recently used cache of finished program results.
+
+    Results are stored under a hash of the language, the normalized code and the input, so a
+    program only ever has to be run once as long as it is deterministic.  The cache is bounded
+    both by the number of entries and by the total length of the cached text."""
+
+    def __init__(self, max_entries: int = 256, max_size: int = 4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(language: str, code: str, *inputs) -> str:
+        digest = hashlib.sha256(language.encode("utf-8"))
+        for part in (code, *inputs):
+            digest.update(b"\0" + str(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """Return the result text and the number of dropped output characters, if cached"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, result: str, dropped: int = 0) -> None:
+        if len(result) > self.max_size:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous[0])
+        self._entries[key] = (result, dropped)
+        self.size += len(result)
+        while len(self._entries) > self.max_entries or self.size > self.max_size:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def entries(self) -> List[list]:
+        """Return every entry, in least recently used order, ready to be saved with `write`"""
+        return [[key, *entry] for key, entry in self._entries.items()]
+
+    def extend(self, entries: List[list]) -> None:
+        for key, result, dropped in entries:
+            self.put(key, result, dropped)
+
+    # The file is only touched through these, so that the cog can run them in an executor
+    # instead of blocking the event loop on disk
+
+    @staticmethod
+    def read(path: str) -> List[list]:
+        """Return the entries saved by `write`, or none if the file does not exist"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    @staticmethod
+    def write(path: str, entries: List[list]) -> None:
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def delete(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
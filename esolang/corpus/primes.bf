@@ -0,0 +1,17 @@
+Prints every prime below 100 by trial division
+
+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+++++++++++++++++++++++++++>++<[->>>>[-]+<<<[->+>>>>>>+<<<<<<<]>>>>>>>[-
+<<<<<<<+>>>>>>>]<<<<<<-->[-]++<[-<[->>>>>>>>>+<<+<<<<<<<]>>>>>>>[-
+<<<<<<<+>>>>>>>]<<<<<[->>>>>>>>>+<<<<+<<<<<]>>>>>[-<<<<<+>>>>>]>>[->+>-
+[>+>>]>[+[-<+>]>+>>]<<<<<<]>[-]>[-]>>[-]<<<<<<<<<+>>>>>>>>[[-]<<<<<<<<[-
+]>>>>>>>>]<<<<<<<<[-<[-]>]<<+<]>>[-<<<[->>>>>>>>>+<<+<<<<<<<]>>>>>>>[-
+<<<<<<<+>>>>>>>]>>>>++++++++++<<[->+>-[>+>>]>[+[-<+>]>+>>]<<<<<<]>[-]>[-
+]<<<<<<<<<[-]>>>>>>>>>>[-<<<<<<<<<<+>>>>>>>>>>]>[-<<<<<+>>>>>]<<<<<[-
+>+<<+>]<[->+<]>>>>++++++++++<<[->+>-[>+>>]>[+[-<+>]>+>>]<<<<<<]>[-]>[-
+]<<<[-]>>>>[-<+>]>[-
+<+>]<[<<<<<<<+>>>>>>>++++++++++++++++++++++++++++++++++++++++++++++++.[-
+]]<<<<<<<[->+<]>>>>>>[-<<<+<+>>>>]<<<<[->>>>+<<<<]>[[-]<<[-]+>>]<<[[-
+]>>>>>++++++++++++++++++++++++++++++++++++++++++++++++.<<<<<]>>>>>[-
+]<<<<<<<<<++++++++++++++++++++++++++++++++++++++++++++++++.[-
+]>>>>>++++++++++++++++++++++++++++++++.[-]<<<<]<<<+<]>>>>>>>>++++++++++.
@@ -1,4 +1,14 @@
-import io
+from .brainfuck import (
+    ADD,
+    CLEAR,
+    EXECUTE,
+    MOVE,
+    OPEN,
+    OUTPUT,
+    OUTPUT_NUMBER,
+    REGISTER,
+    Brainfuck,
+)
 
 
 class COW:
@@ -16,6 +26,21 @@ class COW:
         10: "OOM",
     }
 
+    # What mOO runs for each value in instruction_mapping.  Loops cannot be entered this way,
+    # so the values naming moo and MOO do nothing, and mOO itself is an infinite loop.
+    executable = {
+        0: (MOVE, 0),
+        1: (MOVE, -1),
+        2: (MOVE, 1),
+        4: (ADD, 255),
+        5: (ADD, 1),
+        6: (MOVE, 0),
+        7: (MOVE, 0),
+        8: (CLEAR, None),
+        9: (REGISTER, None),
+        10: (OUTPUT_NUMBER, None),
+    }
+
     @staticmethod
     def cleanup(code):
         return "".join(filter(lambda x: x in ["m", "o", "M", "O"], code))
@@ -24,6 +49,12 @@ class COW:
     def getlines(code):
         return [code[i : i + 50] for i in range(0, len(code), 50)]
 
+    @staticmethod
+    def error(message, code, codeptr):
+        lines = COW.getlines("".join(code))
+        errorptr = ((codeptr * 3) % 50) + 3
+        return SyntaxError(message, ("program.moo", len(lines), errorptr, lines[-1]))
+
     @staticmethod
     def buildbracemap(code):
         temp_bracestack, bracemap = [], {}
@@ -31,6 +62,8 @@ class COW:
             if command == "MOO":
                 temp_bracestack.append(position)
             elif command == "moo":
+                if not temp_bracestack:
+                    raise COW.error("Unmatched moo", code, position)
                 start = temp_bracestack.pop()
                 bracemap[start] = position
                 bracemap[position] = start
@@ -42,7 +75,62 @@ class COW:
         return bracemap
 
     @staticmethod
-    def evaluate(code):
+    def compile(code):
+        """Compile a list of COW commands into ``(opcode, argument)`` pairs.
+
+        The opcodes are shared with Brainfuck, so runs of moves and increments are folded and
+        loops go through `Brainfuck.optimize_loop`.  Also returns the command index each
+        instruction came from, for error reporting."""
+        COW.buildbracemap(code)
+        program, positions, openers = [], [], []
+        index, length = 0, len(code)
+        while index < length:
+            command = code[index]
+            start = index
+            if command in ("MoO", "MOo"):
+                delta = 0
+                while index < length and code[index] in ("MoO", "MOo"):
+                    delta += 1 if code[index] == "MoO" else -1
+                    index += 1
+                delta %= 256
+                if delta:
+                    program.append((ADD, delta))
+                    positions.append(start)
+                continue
+            elif command in ("moO", "mOo"):
+                while index < length and code[index] == command:
+                    index += 1
+                program.append((MOVE, index - start if command == "moO" else start - index))
+                positions.append(start)
+                continue
+            elif command == "MOO":
+                openers.append(len(program))
+                program.append((OPEN, None))
+                positions.append(start)
+            elif command == "moo":
+                Brainfuck.close_loop(program, positions, openers.pop(), start)
+            elif command == "Moo":
+                program.append((OUTPUT, None))
+                positions.append(start)
+            elif command == "OOO":
+                program.append((CLEAR, None))
+                positions.append(start)
+            elif command == "MMM":
+                program.append((REGISTER, None))
+                positions.append(start)
+            elif command == "OOM":
+                program.append((OUTPUT_NUMBER, None))
+                positions.append(start)
+            elif command == "mOO":
+                program += [(EXECUTE, None), (MOVE, 0)]
+                positions += [start, start]
+            else:
+                raise COW.error("Invalid COW command", code, start)
+            index += 1
+        return program, positions
+
+    @staticmethod
+    def evaluate(code, stats=None, output=None, profile=None):
         code = COW.cleanup(code)
 
         if len(code) % 3 != 0:
@@ -52,75 +140,25 @@ class COW:
             )
         code = [code[i : i + 3] for i in range(0, len(code), 3)]
 
-        bracemap = COW.buildbracemap(code)
-        cells, codeptr, cellptr, prev, registry = [0], 0, 0, -1, -1
-        output = io.StringIO("")
+        program, positions = COW.compile(code)
 
-        while codeptr < len(code):
-            command = code[codeptr]
-            if command == "moO":
-                cellptr += 1
-                if cellptr == len(cells):
-                    cells.append(0)
-            elif command == "mOo":
-                cellptr = 0 if cellptr <= 0 else cellptr - 1
-            elif command == "MoO":
-                cells[cellptr] = cells[cellptr] + 1 if cells[cellptr] < 255 else 0
-            elif command == "MOo":
-                cells[cellptr] = cells[cellptr] - 1 if cells[cellptr] > 0 else 255
-            elif command == "MOO":
-                if cells[cellptr] == 0:
-                    codeptr = bracemap[codeptr]
-                else:
-                    prev = cells[cellptr]
-            elif command == "moo":
-                if cells[cellptr] == 0:
-                    prev = 0
-                else:
-                    if cells[cellptr] == prev:
-                        lines = COW.getlines("".join(code))
-                        errorptr = ((codeptr * 3) % 50) + 3
-                        raise SyntaxError(
-                            "Infinite loop: MOO/moo",
-                            ("program.moo", len(lines), errorptr, lines[-1]),
-                        )
-                    else:
-                        codeptr = bracemap[codeptr]
-            elif command == "Moo":
-                output.write(chr(cells[cellptr]))
-            elif command == "mOO":
-                try:
-                    code[codeptr] = COW.instruction_mapping[cells[cellptr]]
-                except KeyError:
-                    lines = COW.getlines("".join(code))
-                    errorptr = ((codeptr * 3) % 50) + 3
-                    raise SyntaxError(
-                        f"Invalid mOO execution in memory address {cellptr}: {cells[cellptr]}",
-                        ("program.moo", len(lines), errorptr, lines[-1]),
-                    )
-                if code[codeptr] == "mOO":
-                    lines = COW.getlines("".join(code))
-                    errorptr = ((codeptr * 3) % 50) + 3
-                    raise SyntaxError(
-                        "Infinite loop: mOO", ("program.moo", len(lines), errorptr, lines[-1])
-                    )
-                continue
-            elif command == "MMM":
-                if registry == -1:
-                    registry = cells[cellptr]
-                else:
-                    cells[cellptr] = registry
-                    registry = -1
-            elif command == "OOO":
-                cells[cellptr] = 0
-            elif command == "OOM":
-                output.write(str(cells[cellptr]))
-            else:
-                lines = COW.getlines("".join(code))
-                errorptr = ((codeptr * 3) % 50) + 3
-                raise SyntaxError(
-                    "Invalid COW command", ("program.moo", len(lines), errorptr, lines[-1])
+        def execute(value, ptr, pc):
+            if value == 3:
+                raise COW.error("Infinite loop: mOO", code, positions[pc])
+            try:
+                return COW.executable[value]
+            except KeyError:
+                raise COW.error(
+                    f"Invalid mOO execution in memory address {ptr}: {value}",
+                    code,
+                    positions[pc],
                 )
 
-            codeptr += 1
-        return output, cells
+        return Brainfuck.run(
+            program,
+            lambda pc: COW.error("Infinite loop: MOO/moo", code, positions[pc]),
+            stats,
+            output,
+            profile,
+            execute,
+        )
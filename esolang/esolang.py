@@ -21,17 +21,86 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-from redbot.core import commands, checks
-from redbot.core.utils.chat_formatting import box
-import traceback
-import functools
-import asyncio
-import inspect
+import io
+import os
+import time
+from typing import List
+
+import discord
+from redbot.core import Config, commands, checks
+from redbot.core.data_manager import cog_data_path
+from redbot.core.utils.chat_formatting import box, humanize_list, humanize_number
 
 from .brainfuck import Brainfuck
 from .cow import COW
-from .befunge import Befunge
+from .befunge import Befunge, DEFAULT_BUDGET
+from .cache import ResultCache
+from .memory import DEFAULT_WINDOW
+from .profiler import PROFILERS
 from .whitespace import Whitespace
+from .sandbox import Sandbox, SandboxBusy, SandboxError, SandboxTimeout
+
+
+def befunge_stack(error):
+    """Grab the top of the Befunge stack from the frame that raised, inside the worker."""
+    tb = error.__traceback__
+    while tb is not None and tb.tb_next is not None:
+        tb = tb.tb_next
+    if tb is None:
+        return None
+    frame_vars = tb.tb_frame.f_locals
+    stack = frame_vars.get("stack", frame_vars.get("self"))
+    internal = getattr(stack, "_internal", None)
+    return None if internal is None else internal[:10]
+
+
+class LiveOutput:
+    """Shows the output of a running program, by editing a message as chunks arrive.
+
+    Only the end of the output is shown, and the message is edited at most once every
+    ``interval`` seconds.  Nothing is sent until the program has been running that long, so
+    quick programs only get their final message."""
+
+    def __init__(self, ctx, interval: float = 2.0, shown: int = 1800):
+        self.ctx = ctx
+        self.interval = interval
+        self.shown = shown
+        self.message = None
+        self.tail = ""
+        self._last = time.monotonic()
+
+    async def __call__(self, text: str) -> None:
+        self.tail = (self.tail + text)[-self.shown :]
+        if time.monotonic() - self._last < self.interval:
+            return
+        content = box(f"[Output (running)]: {self.tail}", lang="ini")
+        if self.message is None:
+            self.message = await self.ctx.send(content)
+        else:
+            await self.message.edit(content=content)
+        self._last = time.monotonic()
+
+    async def finish(self, result: str, dropped: int = 0, files: List[discord.File] = ()) -> None:
+        """Send the final result, attaching it as a file if it is too long for a message"""
+        if dropped:
+            result = f"[Truncated]: first {humanize_number(dropped)} characters dropped\n{result}"
+        content = box(result, lang="ini")
+        if len(content) > 2000:
+            text = discord.File(io.BytesIO(result.encode("utf-8")), filename="output.txt")
+            files = [text, *files]
+            content = "The result is too long, so it is attached as a file."
+        if files:
+            await self.ctx.send(content, files=list(files))
+            # Attachments cannot be added by editing, so the partial output is removed instead
+            if self.message is not None:
+                try:
+                    await self.message.delete()
+                except discord.HTTPException:
+                    pass
+        elif self.message is None:
+            await self.ctx.send(content)
+        else:
+            await self.message.edit(content=content)
 
 
 class Esolang(commands.Cog):
@@ -39,47 +108,203 @@ class Esolang(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.sandbox = Sandbox()
+        self.cache = ResultCache()
+        self.persist_cache = False
+
+        self.conf = Config.get_conf(self, identifier=473541068378341376)
+        self.conf.register_global(
+            befunge_budget=DEFAULT_BUDGET,
+            persist_cache=False,
+            memory_window=DEFAULT_WINDOW,
+            attach_memory=False,
+        )
+        self.task = self.bot.loop.create_task(self.initialize())
+
+    @property
+    def cache_path(self):
+        return os.path.join(cog_data_path(self), "results.json")
+
+    async def initialize(self):
+        self.persist_cache = await self.conf.persist_cache()
+        if self.persist_cache:
+            entries = await self.bot.loop.run_in_executor(None, ResultCache.read, self.cache_path)
+            self.cache.extend(entries)
+
+    async def cog_unload(self):
+        self.task.cancel()
+        self.sandbox.shutdown()
+        if self.persist_cache:
+            await self.bot.loop.run_in_executor(
+                None, ResultCache.write, self.cache_path, self.cache.entries()
+            )
+
+    async def execute(self, ctx, language, func, *args, describe=None, stream=None):
+        """Run an interpreter in the sandbox, sending any failures to the channel.
+
+        Returns ``None`` if the program did not complete."""
+        try:
+            return await self.sandbox.run(func, *args, describe=describe, stream=stream)
+        except SandboxBusy:
+            await ctx.send("Too many programs are running right now, please try again later.")
+        except SandboxTimeout:
+            await ctx.send(f"Your {language} program took too long to run.")
+        except SandboxError as error:
+            if describe is None:
+                await ctx.send(box(error.formatted, lang="py"))
+            else:
+                if error.details is not None:
+                    stack = "[" + "][".join(list(map(str, error.details))) + "]"
+                else:
+                    stack = "Not initialized"
+                await ctx.send(
+                    box(f"[Stack]: {stack}\n[Exception]:\n{error.formatted}", lang="ini")
+                )
+        return None
+
+    async def send_cached(self, ctx, key):
+        """Send the cached result for ``key``, returning whether there was one"""
+        if key is None:
+            return False
+        entry = self.cache.get(key)
+        if entry is None:
+            return False
+        await LiveOutput(ctx).finish(*entry)
+        return True
+
+    async def finish(self, live, key, result, output, memory=None):
+        """Send the result of a program, caching it under ``key`` unless that is ``None``.
+
+        If ``memory`` is given, the whole of it is attached as a file."""
+        dropped = getattr(output, "dropped", 0)
+        if key is not None:
+            self.cache.put(key, result, dropped)
+        files = []
+        if memory is not None:
+            data, filename = memory.dump()
+            files.append(discord.File(io.BytesIO(data), filename=filename))
+        await live.finish(result, dropped, files)
+
+    @checks.is_owner()
+    @commands.group(invoke_without_command=True)
+    async def esolangcache(self, ctx):
+        """Show how the cache of program results is doing.
+
+        Programs that always give the same result are only run once, and repeated runs are
+        answered from this cache."""
+        lookups = self.cache.hits + self.cache.misses
+        rate = f"{self.cache.hits / lookups:.0%}" if lookups else "n/a"
+        await ctx.send(
+            box(
+                f"[Entries]: {humanize_number(len(self.cache))}/"
+                f"{humanize_number(self.cache.max_entries)}\n"
+                f"[Size]: {humanize_number(self.cache.size)} characters\n"
+                f"[Hit rate]: {rate} of {humanize_number(lookups)} lookups\n"
+                f"[Saved to disk]: {self.persist_cache}",
+                lang="ini",
+            )
+        )
+
+    @esolangcache.command(name="clear")
+    async def esolangcache_clear(self, ctx):
+        """Remove every cached result"""
+        self.cache.clear()
+        await self.bot.loop.run_in_executor(None, ResultCache.delete, self.cache_path)
+        await ctx.tick()
+
+    @esolangcache.command(name="persist")
+    async def esolangcache_persist(self, ctx, toggle: bool):
+        """Set whether cached results are saved to disk when the cog is unloaded"""
+        self.persist_cache = toggle
+        await self.conf.persist_cache.set(toggle)
+        await ctx.tick()
+
+    @checks.is_owner()
+    @commands.command()
+    async def esolangmemory(self, ctx, window: int = None, attach: bool = None):
+        """Set how much memory is shown after a program finishes.
+
+        `window` is how many cells are shown either side of the final pointer, or how many
+        values from the top of the Befunge stack.  If `attach` is true, the whole memory is
+        also attached as a file.  Results are not cached while files are attached."""
+        if window is None:
+            window = await self.conf.memory_window()
+            attach = await self.conf.attach_memory()
+            return await ctx.send(
+                f"Showing {humanize_number(window)} cells either side of the pointer, "
+                f"{'with' if attach else 'without'} the full memory attached."
+            )
+        if window < 0:
+            return await ctx.send("The window cannot be negative.")
+        await self.conf.memory_window.set(window)
+        if attach is not None:
+            await self.conf.attach_memory.set(attach)
+        await ctx.tick()
+
+    @checks.is_owner()
+    @commands.command()
+    async def esolangprofile(self, ctx, language: str, *, code):
+        """Run a program while profiling it, to see where it spends its time.
+
+        `language` is one of brainfuck, cow or befunge.  Brainfuck and COW programs show their
+        hottest loops and memory cells, while Befunge programs show a heat map of the playfield.
+
+        Profiled programs run a few times slower, but have the same limits as normal."""
+        language = language.lower()
+        if language not in PROFILERS:
+            return await ctx.send(
+                f"Profiling is only available for {humanize_list(list(PROFILERS))}."
+            )
+        args, describe = (code,), None
+        if language == "befunge":
+            if code.startswith("```") and code.endswith("```"):
+                code = code[3:-3]
+            args, describe = (code, await self.conf.befunge_budget()), befunge_stack
+
+        report = await self.execute(ctx, language, PROFILERS[language], *args, describe=describe)
+        if report is not None:
+            await LiveOutput(ctx).finish(report)
 
     @checks.is_owner()
     @commands.command()
     async def brainfuck(self, ctx, *, code):
         """Run brainfuck code"""
-        try:
-            output, cells = Brainfuck.evaluate(code)
-        except Exception as error:
-            await ctx.send(
-                box("".join(traceback.format_exception_only(type(error), error)), lang="py")
-            )
-        else:
-            output.seek(0)
-            output = output.read()
-            await ctx.send(
-                box(
-                    f"[Memory]: {'[' + ']['.join(list(map(str, cells))) + ']'}\n"
-                    f"[Output]: {output}",
-                    lang="ini",
-                )
+        window, attach = await self.conf.memory_window(), await self.conf.attach_memory()
+        key = None if attach else ResultCache.key("brainfuck", Brainfuck.cleanup(code), window)
+        if await self.send_cached(ctx, key):
+            return
+
+        live = LiveOutput(ctx)
+        result = await self.execute(ctx, "brainfuck", Brainfuck.evaluate, code, stream=live)
+        if result is not None:
+            output, memory = result
+            await self.finish(
+                live,
+                key,
+                f"[Memory]: {memory.render(window)}\n[Output]: {output.getvalue()}",
+                output,
+                memory if attach else None,
             )
 
     @checks.is_owner()
     @commands.command()
     async def cow(self, ctx, *, code):
         """Run COW code"""
-        try:
-            output, cells = COW.evaluate(code)
-        except Exception as error:
-            await ctx.send(
-                box("".join(traceback.format_exception_only(type(error), error)), lang="py")
-            )
-        else:
-            output.seek(0)
-            output = output.read()
-            await ctx.send(
-                box(
-                    f"[Memory]: {'[' + ']['.join(list(map(str, cells))) + ']'}\n"
-                    f"[Output]: {output}",
-                    lang="ini",
-                )
+        window, attach = await self.conf.memory_window(), await self.conf.attach_memory()
+        key = None if attach else ResultCache.key("cow", COW.cleanup(code), window)
+        if await self.send_cached(ctx, key):
+            return
+
+        live = LiveOutput(ctx)
+        result = await self.execute(ctx, "COW", COW.evaluate, code, stream=live)
+        if result is not None:
+            output, memory = result
+            await self.finish(
+                live,
+                key,
+                f"[Memory]: {memory.render(window)}\n[Output]: {output.getvalue()}",
+                output,
+                memory if attach else None,
             )
 
     @checks.is_owner()
@@ -89,37 +314,42 @@ class Esolang(commands.Cog):
         if code.startswith("```") and code.endswith("```"):
             code = code[3:-3]
 
-        try:
-            task = self.bot.loop.create_task(Befunge.evaluate(code))
-            await asyncio.wait_for(task, timeout=5.0)
-            output, cells = task.result()
-        except asyncio.TimeoutError:
-            await ctx.send("Your befunge program took too long to run.")
-        except Exception as error:
-            frame_vars = inspect.trace()[-1][0].f_locals
-            stack = frame_vars.get("stack", frame_vars.get("self"))
-            if stack:
-                stack = "[" + "][".join(list(map(str, stack._internal[:10]))) + "]"
-            else:
-                stack = "Not initialized"
-            await ctx.send(
-                box(
-                    f"[Stack]: {stack}\n"
-                    f"[Exception]:\n{''.join(traceback.format_exception_only(type(error), error))}",
-                    lang="ini",
-                )
-            )
-        else:
-            output.seek(0)
-            output = output.read()
-            await ctx.send(
-                box(
-                    f"[Stack]: {'[' + ']['.join(list(map(str, cells))) + ']'}\n"
-                    f"[Output]: {output}",
-                    lang="ini",
-                )
+        budget = await self.conf.befunge_budget()
+        window, attach = await self.conf.memory_window(), await self.conf.attach_memory()
+        key = None
+        if Befunge.deterministic(code) and not attach:
+            key = ResultCache.key("befunge", code, budget, window)
+            if await self.send_cached(ctx, key):
+                return
+
+        live = LiveOutput(ctx)
+        result = await self.execute(
+            ctx, "befunge", Befunge.evaluate, code, budget, describe=befunge_stack, stream=live
+        )
+        if result is not None:
+            output, stack = result
+            await self.finish(
+                live,
+                key,
+                f"[Stack]: {stack.render(window)}\n[Output]: {output.getvalue()}",
+                output,
+                stack if attach else None,
             )
 
+    @checks.is_owner()
+    @commands.command()
+    async def befungebudget(self, ctx, steps: int = None):
+        """Set how many steps a Befunge program may take before it is stopped.
+
+        Programs are still stopped by the sandbox time limits regardless of this."""
+        if steps is None:
+            budget = await self.conf.befunge_budget()
+            return await ctx.send(f"Befunge programs may run for {humanize_number(budget)} steps.")
+        if steps < 1:
+            return await ctx.send("The step budget must be at least 1.")
+        await self.conf.befunge_budget.set(steps)
+        await ctx.tick()
+
     @checks.is_owner()
     @commands.command()
     async def whitespace(self, ctx, *, code):
@@ -128,28 +358,22 @@ class Esolang(commands.Cog):
         Since Discord auto-converts tabs to spaces, use EM QUAD instead.
 
         If you need to copy it, here: `\u2001`
+
+        To give the program input, put the code in a code block and the input after it.
         """
-        try:
-            wrapped = functools.partial(Whitespace.evaluate, code=code)
-            future = self.bot.loop.run_in_executor(None, wrapped)
-            for x in range(500):
-                await asyncio.sleep(0.01)
-                try:
-                    output = future.result()
-                except asyncio.InvalidStateError:
-                    continue
-                else:
-                    break
-        except Exception as error:
-            await ctx.send(
-                box("".join(traceback.format_exception_only(type(error), error)), lang="py")
-            )
-        else:
-            output.seek(0)
-            output = output.read()
-            await ctx.send(
-                box(
-                    f"[Output]: {output}",
-                    lang="ini",
-                )
-            )
+        stdin = ""
+        if code.startswith("```"):
+            closing = code.find("```", 3)
+            if closing != -1:
+                code, stdin = code[: closing + 3], code[closing + 3 :].strip()
+
+        key = ResultCache.key("whitespace", Whitespace.clean_syntax(code), stdin)
+        if await self.send_cached(ctx, key):
+            return
+
+        live = LiveOutput(ctx)
+        output = await self.execute(
+            ctx, "whitespace", Whitespace.evaluate, code, stdin, stream=live
+        )
+        if output is not None:
+            await self.finish(live, key, f"[Output]: {output.getvalue()}", output)
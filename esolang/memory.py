@@ -0,0 +1,55 @@
+from itertools import groupby
+from typing import Sequence, Tuple
+
+DEFAULT_WINDOW = 16
+
+
+class Memory:
+    """The memory a program finished with, and where its pointer was left.
+
+    Tapes are kept as bytes, one per cell, which is compact to send back from the sandbox and
+    can be attached as is.  Stacks are kept as a list, with the pointer at the top."""
+
+    def __init__(self, cells: Sequence[int], pointer: int, name: str = "memory"):
+        self.cells = cells
+        self.pointer = pointer
+        self.name = name
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def render(self, window: int = DEFAULT_WINDOW, threshold: int = 3) -> str:
+        """Show ``window`` cells either side of the pointer.
+
+        Runs of at least ``threshold`` zero cells are shown as ``[0 x count]`` and the pointer
+        cell is marked with ``>``.  Only the cells in the window are looked at, so this takes
+        the same time whatever the size of the memory."""
+        if not self.cells:
+            return "Empty"
+        pointer = min(max(self.pointer, 0), len(self.cells) - 1)
+        start = max(pointer - window, 0)
+        end = min(pointer + window + 1, len(self.cells))
+
+        def compress(cells):
+            for value, run in groupby(cells):
+                count = len(list(run))
+                if value == 0 and count >= threshold:
+                    parts.append(f"[0 x {count}]")
+                else:
+                    parts.extend([f"[{value}]"] * count)
+
+        parts = []
+        if start:
+            parts.append(f"({start} cells before)")
+        compress(self.cells[start:pointer])
+        parts.append(f"[>{self.cells[pointer]}]")
+        compress(self.cells[pointer + 1 : end])
+        if end < len(self.cells):
+            parts.append(f"({len(self.cells) - end} cells after)")
+        return "".join(parts)
+
+    def dump(self) -> Tuple[bytes, str]:
+        """Return the whole memory as file contents, along with a file name"""
+        if isinstance(self.cells, (bytes, bytearray)):
+            return bytes(self.cells), f"{self.name}.bin"
+        return "\n".join(map(str, self.cells)).encode("utf-8"), f"{self.name}.txt"
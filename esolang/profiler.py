@@ -0,0 +1,175 @@
+import math
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from .befunge import DEFAULT_BUDGET, Befunge
+from .brainfuck import OPEN, Brainfuck
+from .cow import COW
+
+HEAT = " .:-=+*#%@"
+
+
+class CountingList(list):
+    """A list that counts how often each index is read"""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.counts = [0] * len(self)
+
+    def __getitem__(self, index):
+        self.counts[index] += 1
+        return super().__getitem__(index)
+
+
+class CountingTape(bytearray):
+    """A bytearray that counts how often each cell is read"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.counts: Dict[int, int] = defaultdict(int)
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            self.counts[index] += 1
+        return super().__getitem__(index)
+
+
+class Profile:
+    """Execution counts collected while a program runs.
+
+    The interpreters check for a profile once before they start, and if there is one swap
+    their program and memory for counting versions.  Without one they run exactly as before, so
+    profiling costs nothing while it is off."""
+
+    def __init__(self):
+        self.program: Optional[CountingList] = None
+        self.tape: Optional[CountingTape] = None
+        self.stats = {}
+
+    def watch_program(self, program) -> CountingList:
+        self.program = CountingList(program)
+        return self.program
+
+    def watch_tape(self, tape: bytearray) -> CountingTape:
+        self.tape = CountingTape(tape)
+        return self.tape
+
+    @property
+    def steps(self) -> int:
+        return self.stats.get("steps", 0)
+
+    def hot_loops(self, positions: List[int], bracemap: Dict[int, int], top: int = 5):
+        """Return the loops that took the most steps, hottest first.
+
+        Each loop is ``(start, end, entries, iterations, steps)``, where ``iterations`` is
+        ``None`` if the loop only ever ran as a single instruction the compiler replaced it
+        with.  Steps include those of nested loops."""
+        program, counts = self.program, self.program.counts
+        # Instructions are compiled in source order, so a loop is a slice of the program
+        totals = list(accumulate(counts[: len(positions)], initial=0))
+        loops = []
+        for start, end in bracemap.items():
+            if start > end:
+                continue
+            first, last = bisect_left(positions, start), bisect_right(positions, end)
+            steps = totals[last] - totals[first]
+            if not steps:
+                continue
+            iterations = None
+            for pc in range(first, last):
+                op, arg = list.__getitem__(program, pc)
+                if op == OPEN and positions[pc] == start:
+                    if counts[pc]:
+                        iterations = counts[arg]
+                    break
+            loops.append((start, end, counts[first], iterations, steps))
+        loops.sort(key=lambda loop: loop[4], reverse=True)
+        return loops[:top]
+
+    def hot_cells(self, top: int = 5):
+        counts = self.tape.counts
+        return sorted(counts.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    def heat_map(self, width: int, height: int) -> str:
+        """Draw how often every cell of a Befunge playfield was run, from `` `` to ``@``"""
+        counts = self.program.counts
+        scale = (len(HEAT) - 1) / (math.log(max(counts) + 1) or 1)
+        rows = []
+        for y in range(height):
+            row = counts[y * width : (y + 1) * width]
+            # Rounding can push the busiest cells just past the last shade
+            cells = (
+                HEAT[min(math.ceil(math.log(count + 1) * scale), len(HEAT) - 1)] for count in row
+            )
+            rows.append("".join(cells).rstrip())
+        return "\n".join(rows)
+
+
+def _tape_report(profile: Profile, positions, bracemap, source: str, join: str) -> List[str]:
+    lines = [f"[Steps]: {profile.steps:,}", "[Hottest loops]"]
+    for rank, (start, end, entries, iterations, steps) in enumerate(
+        profile.hot_loops(positions, bracemap), 1
+    ):
+        if iterations is None:
+            runs = "replaced by one instruction"
+        else:
+            runs = f"{iterations:,} iterations"
+        share = steps / profile.steps if profile.steps else 0
+        snippet = join(source[start : end + 1])
+        if len(snippet) > 60:
+            snippet = snippet[:57] + "..."
+        lines.append(
+            f"#{rank} at {start}-{end}: {entries:,} entries, {runs}, {steps:,} steps ({share:.0%})"
+        )
+        lines.append(f"   {snippet}")
+    if len(lines) == 2:
+        lines.append("None")
+    cells = " ".join(f"[{cell}]: {count:,}" for cell, count in profile.hot_cells())
+    lines.append(f"[Hottest cells]: {cells or 'None'}")
+    return lines
+
+
+def profile_brainfuck(code: str) -> str:
+    profile = Profile()
+    Brainfuck.evaluate(code, profile.stats, profile=profile)
+    code = Brainfuck.cleanup(code)
+    _, positions = Brainfuck.compile(code)
+    bracemap = Brainfuck.buildbracemap(code)
+    return "\n".join(_tape_report(profile, positions, bracemap, code, "".join))
+
+
+def profile_cow(code: str) -> str:
+    profile = Profile()
+    COW.evaluate(code, profile.stats, profile=profile)
+    code = COW.cleanup(code)
+    code = [code[i : i + 3] for i in range(0, len(code), 3)]
+    _, positions = COW.compile(code)
+    bracemap = COW.buildbracemap(code)
+    return "\n".join(_tape_report(profile, positions, bracemap, code, " ".join))
+
+
+def profile_befunge(code: str, budget: int = DEFAULT_BUDGET) -> str:
+    profile = Profile()
+    Befunge.evaluate(code, budget, profile.stats, profile=profile)
+    codemap = Befunge.buildcodemap(code)
+    height, width = len(codemap), len(codemap[0])
+    counts = profile.program.counts
+    hottest = sorted(range(len(counts)), key=counts.__getitem__, reverse=True)[:5]
+    cells = " ".join(
+        f"({cell % width},{cell // width}) {codemap[cell // width][cell % width]!r}: "
+        f"{counts[cell]:,}"
+        for cell in hottest
+        if counts[cell]
+    )
+    lines = [
+        f"[Steps]: {profile.steps:,}",
+        f"[Hottest cells]: {cells}",
+        "[Heat map]",
+        profile.heat_map(width, height),
+    ]
+    return "\n".join(lines)
+
+
+PROFILERS = {"brainfuck": profile_brainfuck, "cow": profile_cow, "befunge": profile_befunge}
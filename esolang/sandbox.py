@@ -0,0 +1,202 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import traceback
+from typing import Any, Awaitable, Callable, Optional
+
+from .stream import DEFAULT_CAPACITY, RingBuffer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Forking lets the worker run any callable that is already loaded in the bot, which matters
+# because cogs are not importable by name from a freshly spawned interpreter, and rules out the
+# spawn and forkserver contexts.  The bot has other threads though, and a lock that one of them
+# held when forking stays held in the worker.  The worker only sets its limits, runs the
+# interpreter and writes to its pipe, none of which take such locks, and if it still hangs it
+# is killed at the wall-clock limit like any other program.
+if "fork" in multiprocessing.get_all_start_methods():
+    _context = multiprocessing.get_context("fork")
+else:
+    _context = multiprocessing.get_context()
+
+
+# Exceptions
+class SandboxBusy(Exception):
+    """Raised when the queue of programs waiting to run is full"""
+
+
+class SandboxTimeout(Exception):
+    """Raised when a program runs out of wall-clock or CPU time"""
+
+
+class SandboxError(Exception):
+    """Raised when a program fails inside the worker process.
+
+    Exceptions are not sent back as-is since most of the interpreter exceptions cannot be
+    pickled, so the formatted exception and any extra details are sent instead."""
+
+    def __init__(self, formatted: str, details: Any = None):
+        super().__init__(formatted)
+        self.formatted = formatted
+        self.details = details
+
+
+_CRASHED = object()
+
+
+def _address_space() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _worker(
+    conn,
+    cpu_time: int,
+    memory: int,
+    func: Callable,
+    args: tuple,
+    describe: Callable,
+    capacity: Optional[int],
+):
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, cpu_time + 1))
+        # The forked worker starts with the bot's whole address space, so the memory limit is
+        # added on top of what is already mapped rather than replacing it.
+        current = _address_space()
+        if current is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (current + memory, current + memory))
+    kwargs = {}
+    if capacity is not None:
+        kwargs["output"] = RingBuffer(capacity, lambda text: conn.send(("chunk", text, None)))
+    try:
+        result = func(*args, **kwargs)
+    except BaseException as error:
+        formatted = "".join(traceback.format_exception_only(type(error), error))
+        details = describe(error) if describe else None
+        conn.send(("error", formatted, details))
+    else:
+        conn.send(("ok", result, None))
+    finally:
+        conn.close()
+
+
+def _wait(conn, timeout: float):
+    if not conn.poll(timeout):
+        return None
+    try:
+        return conn.recv()
+    except EOFError:
+        return _CRASHED
+
+
+class Sandbox:
+    """Runs interpreters in separate processes so that they cannot block the bot.
+
+    At most ``workers`` programs run at once, and at most ``queue_size`` more are allowed to
+    wait for a free worker.  Every program gets its own process which is killed once it
+    exceeds ``wall_time`` seconds, or the task awaiting it is cancelled.
+
+    Streamed programs keep at most ``output_capacity`` characters of their output."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 8,
+        wall_time: float = 10.0,
+        cpu_time: int = 10,
+        memory: int = 256 * 1024 * 1024,
+        output_capacity: int = DEFAULT_CAPACITY,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.memory = memory
+        self.output_capacity = output_capacity
+
+        self._slots = asyncio.Semaphore(workers)
+        self._pending = 0
+        self._processes = set()
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        describe: Callable = None,
+        stream: Callable[[str], Awaitable[None]] = None,
+    ) -> Any:
+        """Run ``func(*args)`` in a worker process and return its result.
+
+        ``describe`` is called in the worker with any exception raised, and its return value
+        is attached to the `SandboxError` as ``details``.
+
+        If ``stream`` is given, ``func`` is also passed a `RingBuffer` as ``output``, and
+        ``stream`` is awaited with every chunk written to it while the program runs."""
+        if self._pending >= self.workers + self.queue_size:
+            raise SandboxBusy("Too many programs are waiting to run")
+        self._pending += 1
+        try:
+            async with self._slots:
+                return await self._run(func, args, describe, stream)
+        finally:
+            self._pending -= 1
+
+    async def _run(self, func: Callable, args: tuple, describe: Callable, stream) -> Any:
+        loop = asyncio.get_running_loop()
+        receiver, sender = _context.Pipe(duplex=False)
+        capacity = None if stream is None else self.output_capacity
+        process = _context.Process(
+            target=_worker,
+            args=(sender, self.cpu_time, self.memory, func, args, describe, capacity),
+            daemon=True,
+        )
+        process.start()
+        sender.close()
+        self._processes.add(process)
+        deadline = loop.time() + self.wall_time
+        waiting = None
+        try:
+            while True:
+                timeout = max(deadline - loop.time(), 0)
+                waiting = loop.run_in_executor(None, _wait, receiver, timeout)
+                # Shielded, so that cancelling the run leaves the poll running to its end
+                message = await asyncio.shield(waiting)
+                if message is None or message is _CRASHED or message[0] != "chunk":
+                    break
+                await stream(message[1])
+        finally:
+            if process.is_alive():
+                process.kill()
+            if waiting is not None and not waiting.done():
+                # The poll returns once the killed worker's end of the pipe is closed, and the
+                # receiver must stay open until then
+                waiting.add_done_callback(lambda _: receiver.close())
+            else:
+                receiver.close()
+            await loop.run_in_executor(None, process.join)
+            self._processes.discard(process)
+
+        if message is None:
+            raise SandboxTimeout("Program exceeded the wall-clock limit")
+        if message is _CRASHED:
+            sigxcpu = getattr(signal, "SIGXCPU", None)
+            if sigxcpu is not None and process.exitcode == -sigxcpu:
+                raise SandboxTimeout("Program exceeded the CPU time limit")
+            raise SandboxError(f"Program crashed with exit code {process.exitcode}\n")
+        status, payload, details = message
+        if status == "error":
+            raise SandboxError(payload, details)
+        return payload
+
+    def shutdown(self):
+        for process in self._processes:
+            if process.is_alive():
+                process.kill()
+        self._processes.clear()
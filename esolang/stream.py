@@ -0,0 +1,66 @@
+import time
+from typing import Callable, List, Optional
+
+DEFAULT_CAPACITY = 1024 * 1024
+
+
+class RingBuffer:
+    """A write-only text stream that only keeps the last ``capacity`` characters written.
+
+    Writes are collected and passed to ``flush`` in chunks, once ``chunk_size`` characters are
+    waiting or ``interval`` seconds after the previous chunk, so that the output can be shown
+    while the program is still running.  Memory use stays bounded however much is written.
+
+    When pickled, for example to be sent back from a sandbox worker, any waiting output is
+    flushed first and the callback is left behind."""
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        flush: Optional[Callable[[str], None]] = None,
+        chunk_size: int = 4096,
+        interval: float = 0.5,
+    ):
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.interval = interval
+        self.written = 0
+        self._flush = flush
+        self._retained = ""
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._deadline = time.monotonic() + interval
+
+    def write(self, text: str) -> int:
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= self.chunk_size or time.monotonic() >= self._deadline:
+            self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        self._deadline = time.monotonic() + self.interval
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._pending_size = 0
+        self.written += len(text)
+        self._retained = (self._retained + text)[-self.capacity :]
+        if self._flush is not None:
+            self._flush(text)
+
+    def getvalue(self) -> str:
+        self.flush()
+        return self._retained
+
+    @property
+    def dropped(self) -> int:
+        """How many of the flushed characters are no longer kept"""
+        return self.written - len(self._retained)
+
+    def __getstate__(self):
+        self.flush()
+        state = self.__dict__.copy()
+        state["_flush"] = None
+        return state
@@ -1,10 +1,10 @@
-from typing import List
+from typing import Dict, List, TextIO, Tuple
 import io
+from itertools import count
 
 
-# Exceptions
-class EmptyStack(SyntaxError):
-    """Raised when the the stack is accessed in an empty state"""
+class WhitespaceError(SyntaxError):
+    """Base for errors that point at a position in the cleaned program"""
 
     def __init__(self, message: str, code: str, pointer: int):
         if pointer > 50:
@@ -20,99 +20,116 @@ class EmptyStack(SyntaxError):
         )
 
 
-class InvalidNumber(SyntaxError):
+# Exceptions
+class EmptyStack(WhitespaceError):
+    """Raised when the the stack is accessed in an empty state"""
+
+
+class InvalidNumber(WhitespaceError):
     """Raised when a number fails to be parsed"""
 
-    def __init__(self, message: str, code: str, pointer: int):
-        if pointer > 50:
-            line = pointer // 50
-            start = line * 50
-            code = code[start : start + 50]
-            pointer %= 50
-        else:
-            line = 0
-        super().__init__(
-            message,
-            ("program.ws", line + 1, pointer + 1, code),
-        )
 
+class UnknownCommand(WhitespaceError):
+    """Raised when the program contains a sequence that is not a command"""
 
-# Core classes
 
+class UnknownLabel(WhitespaceError):
+    """Raised when a jump or call targets a label that is never marked"""
 
-class Stack:
-    def __init__(self, code: str):
-        self._internal: List[int] = []
-        self.code = code
-        self.pointer: int = 0
-
-    def push(self, value: int) -> None:
-        self._internal.append(value)
-
-    def __pop(self) -> int:
-        return self._internal.pop()
-
-    def pop(self) -> int:
-        try:
-            return self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in pop call", self.code, self.pointer)
-
-    def duplicate(self) -> None:
-        try:
-            a = self.__pop()
-        except IndexError:
-            a = 0
-        self.push(a)
-        self.push(a)
-
-    def swap(self) -> None:
-        try:
-            a = self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in swap call", self.code, self.pointer)
-
-        try:
-            b = self.__pop()
-        except IndexError:
-            b = 0
-        self.push(a)
-        self.push(b)
-
-    def addition(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in addition call", self.codemap, self.pointer)
-        self.push(a + b)
-
-    def subtraction(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in subtraction call", self.codemap, self.pointer)
-        self.push(a - b)
-
-    def multiplication(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in multiplication call", self.codemap, self.pointer)
-        self.push(a * b)
-
-    def division(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in division call", self.codemap, self.pointer)
-        self.push(a // b)
-
-    def modulo(self) -> None:
-        try:
-            a, b = self.__pop(), self.__pop()
-        except IndexError:
-            raise EmptyStack("Empty stack in modulo call", self.codemap, self.pointer)
-        self.push(a % b)
+
+class EndOfInput(WhitespaceError):
+    """Raised when the program reads more input than it was given"""
+
+
+class DivisionByZero(WhitespaceError):
+    """Raised when the top of the stack is zero in a division or modulo"""
+
+
+# Opcodes
+PUSH = 0
+COPY = 1
+SLIDE = 2
+DUPLICATE = 3
+SWAP = 4
+DISCARD = 5
+ADDITION = 6
+SUBTRACTION = 7
+MULTIPLICATION = 8
+DIVISION = 9
+MODULO = 10
+STORE = 11
+RETRIEVE = 12
+MARK = 13
+CALL = 14
+JUMP = 15
+JUMP_ZERO = 16
+JUMP_NEGATIVE = 17
+RETURN = 18
+END = 19
+OUTPUT_CHAR = 20
+OUTPUT_NUMBER = 21
+READ_CHAR = 22
+READ_NUMBER = 23
+
+NUMBER = "number"
+LABEL = "label"
+
+# No command is a prefix of another, so the tokenizer can match greedily
+COMMANDS: Dict[str, Tuple[int, str]] = {
+    # Stack manipulation
+    "ss": (PUSH, NUMBER),
+    "sts": (COPY, NUMBER),
+    "stl": (SLIDE, NUMBER),
+    "sls": (DUPLICATE, None),
+    "slt": (SWAP, None),
+    "sll": (DISCARD, None),
+    # Arithmetic
+    "tsss": (ADDITION, None),
+    "tsst": (SUBTRACTION, None),
+    "tssl": (MULTIPLICATION, None),
+    "tsts": (DIVISION, None),
+    "tstt": (MODULO, None),
+    # Heap access
+    "tts": (STORE, None),
+    "ttt": (RETRIEVE, None),
+    # Flow control
+    "lss": (MARK, LABEL),
+    "lst": (CALL, LABEL),
+    "lsl": (JUMP, LABEL),
+    "lts": (JUMP_ZERO, LABEL),
+    "ltt": (JUMP_NEGATIVE, LABEL),
+    "ltl": (RETURN, None),
+    "lll": (END, None),
+    # I/O
+    "tlss": (OUTPUT_CHAR, None),
+    "tlst": (OUTPUT_NUMBER, None),
+    "tlts": (READ_CHAR, None),
+    "tltt": (READ_NUMBER, None),
+}
+
+NAMES = {
+    COPY: "copy",
+    SLIDE: "slide",
+    DUPLICATE: "duplicate",
+    SWAP: "swap",
+    DISCARD: "discard",
+    ADDITION: "addition",
+    SUBTRACTION: "subtraction",
+    MULTIPLICATION: "multiplication",
+    DIVISION: "division",
+    MODULO: "modulo",
+    STORE: "store",
+    RETRIEVE: "retrieve",
+    JUMP_ZERO: "jump if zero",
+    JUMP_NEGATIVE: "jump if negative",
+    OUTPUT_CHAR: "output character",
+    OUTPUT_NUMBER: "output number",
+    READ_CHAR: "read character",
+    READ_NUMBER: "read number",
+}
+
+
+# Core classes
 
 
 class Whitespace:
@@ -127,77 +144,155 @@ class Whitespace:
         return code
 
     @staticmethod
-    def parse_to_number(stack: Stack, number: str) -> int:
-        try:
-            sign = 1 if number[0] == "s" else -1
-
-            number = number[1:].replace("s", "0").replace("t", "1")
-            number = int(number, 2)
-            return number * sign
-        except IndexError:
-            raise InvalidNumber(
-                "Incorrect number: must be at least two chars", stack.code, stack.pointer
-            )
+    def parse_to_number(code: str, pointer: int, number: str) -> int:
+        if not number:
+            raise InvalidNumber("Incorrect number: a sign is required", code, pointer)
+        sign = 1 if number[0] == "s" else -1
+        bits = number[1:].replace("s", "0").replace("t", "1")
+        return int(bits, 2) * sign if bits else 0
 
     @staticmethod
-    def evaluate(code: str) -> io.StringIO:
-        code: str = Whitespace.clean_syntax(code)
-        stack: Stack = Stack(code)
-        command: str = ""
-        param: str = ""
+    def tokenize(code: str) -> Tuple[List[Tuple[int, object]], List[int]]:
+        """Parse the cleaned program into ``(opcode, argument)`` pairs in a single pass.
+
+        Label marks are removed and every jump and call is resolved to the index of the
+        instruction following its label.  Also returns the source position of every
+        instruction, for error reporting."""
+        program, positions, labels = [], [], {}
+        pointer, length = 0, len(code)
+        while pointer < length:
+            start = pointer
+            command = code[pointer]
+            pointer += 1
+            while command not in COMMANDS:
+                if pointer >= length or len(command) == 4:
+                    raise UnknownCommand(f"Unknown command: {command}", code, start)
+                command += code[pointer]
+                pointer += 1
+            opcode, kind = COMMANDS[command]
+            argument = None
+            if kind is not None:
+                end = code.find("l", pointer)
+                if end == -1:
+                    raise InvalidNumber(f"Unterminated {kind}", code, start)
+                argument = code[pointer:end]
+                pointer = end + 1
+                if kind == NUMBER:
+                    argument = Whitespace.parse_to_number(code, start, argument)
+            if opcode == MARK:
+                labels[argument] = len(program)
+                continue
+            program.append((opcode, argument))
+            positions.append(start)
 
-        output: io.StringIO = io.StringIO("")
+        for index, (opcode, argument) in enumerate(program):
+            if opcode in (CALL, JUMP, JUMP_ZERO, JUMP_NEGATIVE):
+                if argument not in labels:
+                    raise UnknownLabel("Unknown label", code, positions[index])
+                program[index] = (opcode, labels[argument])
+        return program, positions
 
-        while stack.pointer <= len(code):
-            print(command)
-            print(stack._internal)
+    @staticmethod
+    def evaluate(code: str, stdin: str = "", stats: dict = None, output: TextIO = None) -> TextIO:
+        code: str = Whitespace.clean_syntax(code)
+        program, positions = Whitespace.tokenize(code)
+        stack: List[int] = []
+        heap: Dict[int, int] = {}
+        calls: List[int] = []
+        if output is None:
+            output = io.StringIO()
+        write = output.write
+        reading = 0
+
+        # Running off the end of the program is the same as reaching an end command
+        program.append((END, None))
+        pc = 0
+        for steps in count():
+            opcode, argument = program[pc]
+            pc += 1
             try:
-                target = code[stack.pointer]
+                if opcode == PUSH:
+                    stack.append(argument)
+                elif opcode == DUPLICATE:
+                    stack.append(stack[-1])
+                elif opcode == ADDITION:
+                    a = stack.pop()
+                    stack.append(stack.pop() + a)
+                elif opcode == SUBTRACTION:
+                    a = stack.pop()
+                    stack.append(stack.pop() - a)
+                elif opcode == JUMP_ZERO:
+                    if stack.pop() == 0:
+                        pc = argument
+                elif opcode == JUMP_NEGATIVE:
+                    if stack.pop() < 0:
+                        pc = argument
+                elif opcode == JUMP:
+                    pc = argument
+                elif opcode == RETRIEVE:
+                    stack.append(heap.get(stack.pop(), 0))
+                elif opcode == STORE:
+                    value = stack.pop()
+                    heap[stack.pop()] = value
+                elif opcode == SWAP:
+                    stack[-1], stack[-2] = stack[-2], stack[-1]
+                elif opcode == DISCARD:
+                    stack.pop()
+                elif opcode == MULTIPLICATION:
+                    a = stack.pop()
+                    stack.append(stack.pop() * a)
+                elif opcode == DIVISION:
+                    a = stack.pop()
+                    stack.append(stack.pop() // a)
+                elif opcode == MODULO:
+                    a = stack.pop()
+                    stack.append(stack.pop() % a)
+                elif opcode == CALL:
+                    calls.append(pc)
+                    pc = argument
+                elif opcode == RETURN:
+                    pc = calls.pop()
+                elif opcode == COPY:
+                    if argument < 0:
+                        raise IndexError
+                    stack.append(stack[-1 - argument])
+                elif opcode == SLIDE:
+                    top = stack.pop()
+                    if argument > 0:
+                        del stack[-argument:]
+                    stack.append(top)
+                elif opcode == OUTPUT_CHAR:
+                    write(chr(stack.pop()))
+                elif opcode == OUTPUT_NUMBER:
+                    write(str(stack.pop()))
+                elif opcode == READ_CHAR:
+                    if reading >= len(stdin):
+                        raise EndOfInput("No input left to read", code, positions[pc - 1])
+                    heap[stack.pop()] = ord(stdin[reading])
+                    reading += 1
+                elif opcode == READ_NUMBER:
+                    if reading >= len(stdin):
+                        raise EndOfInput("No input left to read", code, positions[pc - 1])
+                    newline = stdin.find("\n", reading)
+                    newline = len(stdin) if newline == -1 else newline
+                    line, reading = stdin[reading:newline], newline + 1
+                    try:
+                        number = int(line)
+                    except ValueError:
+                        raise InvalidNumber(
+                            f"Input is not a number: {line}", code, positions[pc - 1]
+                        )
+                    heap[stack.pop()] = number
+                elif opcode == END:
+                    break
             except IndexError:
-                target = ""
-            if command == "ss":
-                if target == "l":
-                    number = Whitespace.parse_to_number(stack, param)
-                    stack.push(number)
-                    command, param = "", ""
-                elif target:
-                    param += target
-                else:
-                    raise InvalidNumber(
-                        "Incorrect stack push: No argument supplied", stack.code, stack.pointer
-                    )
-                stack.pointer += 1
-                continue
-            elif command == "sls":
-                stack.duplicate()
-                command, param = "", ""
-            elif command == "slt":
-                stack.swap()
-                command, param = "", ""
-            elif command == "sll":
-                stack.pop()
-                command, param = "", ""
-            elif command == "tsss":
-                stack.addition()
-                command, param = "", ""
-            elif command == "tsst":
-                stack.subtraction()
-                command, param = "", ""
-            elif command == "tssl":
-                stack.multiplication()
-                command, param = "", ""
-            elif command == "tsts":
-                stack.division()
-                command, param = "", ""
-            elif command == "tstt":
-                stack.modulo()
-                command, param = "", ""
-            elif command == "tlss":
-                output.write(chr(stack.pop()))
-                command, param = "", ""
-            elif command == "tlst":
-                output.write(str(stack.pop()))
-                command, param = "", ""
-            command += target
-            stack.pointer += 1
+                if opcode == RETURN:
+                    raise EmptyStack("Return outside of a subroutine", code, positions[pc - 1])
+                raise EmptyStack(f"Empty stack in {NAMES[opcode]} call", code, positions[pc - 1])
+            except ZeroDivisionError:
+                raise DivisionByZero(
+                    f"Division by zero in {NAMES[opcode]} call", code, positions[pc - 1]
+                )
+        if stats is not None:
+            stats["steps"] = steps
         return output
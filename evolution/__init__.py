@@ -1,7 +1,3 @@
-from . import bank
-
-from .evolution import Evolution
-
 __red_end_user_data_statement__ = (
     "This cog stores user's Discord IDs for the sake of storing game data. "
     "Users may delete their own data at the cost of losing game data through "
@@ -12,10 +8,19 @@ __red_end_user_data_statement__ = (
 
 
 async def setup(bot):
+    # Imported here, so that the economy can be simulated without Red
+    from . import bank
+    from .evolution import Evolution
+
     bank._init(bot)
     is_global = await bank.is_global()
     if not is_global:
         raise RuntimeError("Bank must be global for this cog to work.")
     cog = Evolution(bot)
+    # Commands read the player store, so it is loaded before they can be used
+    try:
+        await cog.utils.initialize()
+    except Exception:
+        await cog.cog_unload()
+        raise
     await bot.add_cog(cog)
-    await cog.utils.initialize()
@@ -2,8 +2,21 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import heapq
+import time
+import weakref
 from functools import wraps
-from typing import TYPE_CHECKING, List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import discord
 from redbot.core import Config, bank, commands, errors
@@ -12,6 +25,9 @@ from redbot.core.bank import BankPruneError as BankPruneError
 from redbot.core.i18n import Translator
 from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import humanize_number
+from sortedcontainers import SortedList
+
+from .locks import UserLocks
 
 if TYPE_CHECKING:
     from redbot.core.bot import Red
@@ -48,6 +64,7 @@ __all__ = [
     "get_next_payday",
     "set_next_payday",
     "BankPruneError",
+    "BalanceLedger",
 ]
 
 _MAX_BALANCE = 2**63 - 1
@@ -59,6 +76,159 @@ _config: Config = None
 _bot: Red = None
 
 
+class LeaderboardIndex:
+    """Every account of the separate economy, kept in leaderboard order.
+
+    The index is loaded from the bank the first time it is used, and updated whenever a balance
+    is changed through this module.  Since other cogs can write to the same bank, it is also
+    reloaded once it is ``max_age`` seconds old.  Ties are broken by user ID."""
+
+    def __init__(self, max_age: float = 300):
+        self.max_age = max_age
+        self._accounts: Dict[int, dict] = {}
+        self._order = SortedList()
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age
+
+    async def load(self) -> None:
+        async with self._lock:
+            if self.loaded:
+                return
+            accounts = await _config.all_users()
+            self._accounts = {int(user_id): account for user_id, account in accounts.items()}
+            self._order = SortedList(
+                (-account["balance"], user_id) for user_id, account in self._accounts.items()
+            )
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def update(self, user_id: int, **values) -> None:
+        """Update the stored account of ``user_id``, if the index is loaded"""
+        if self._loaded_at is None:
+            return
+        user_id = int(user_id)
+        account = self._accounts.get(user_id)
+        if account is None:
+            account = self._accounts[user_id] = dict(_DEFAULT_MEMBER)
+        else:
+            self._order.remove((-account["balance"], user_id))
+        account.update(values)
+        self._order.add((-account["balance"], user_id))
+
+    def top(self, positions: int = None, members: Set[int] = None) -> List[tuple]:
+        """Return the leaderboard as ``(user_id, raw_account)`` pairs.
+
+        If ``members`` is given, only accounts whose ID is in it are included."""
+        if members is None:
+            order = self._order if positions is None else self._order[:positions]
+        else:
+            entries = (
+                (-self._accounts[user_id]["balance"], user_id)
+                for user_id in members & self._accounts.keys()
+            )
+            if positions is None:
+                order = sorted(entries)
+            else:
+                order = heapq.nsmallest(positions, entries)
+        return [(user_id, self._accounts[user_id]) for _, user_id in order]
+
+    def remove(self, user_id: int) -> None:
+        account = self._accounts.pop(user_id, None)
+        if account is not None:
+            self._order.remove((-account["balance"], user_id))
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Return the leaderboard position of ``user_id``, starting at 1"""
+        account = self._accounts.get(user_id)
+        if account is None:
+            return None
+        return self._order.bisect_left((-account["balance"], user_id)) + 1
+
+
+class AccountCache:
+    """Read-through cache of single accounts of the separate economy.
+
+    Looking up an account only reads that account, and balance changes made through this module
+    are written through to the cache.  Other cogs share the bank, so entries are read again once
+    they are ``max_age`` seconds old."""
+
+    def __init__(self, max_age: float = 10):
+        self.max_age = max_age
+        self._accounts: Dict[int, Tuple[float, dict]] = {}
+
+    async def get(self, user_id: int) -> dict:
+        entry = self._accounts.get(user_id)
+        if entry is not None and time.monotonic() - entry[0] < self.max_age:
+            return entry[1]
+        users = _config._get_base_group(_config.USER)
+        raw = await users.get_raw(str(user_id), default=None)
+        if raw is None:
+            account = {"balance": 250, "next_payday": 0}
+        else:
+            account = {**_DEFAULT_MEMBER, **raw}
+        self._accounts[user_id] = (time.monotonic(), account)
+        return account
+
+    def update(self, user_id: int, **values) -> None:
+        entry = self._accounts.get(user_id)
+        if entry is not None:
+            entry[1].update(values)
+
+    def invalidate(self, user_id: int = None) -> None:
+        if user_id is None:
+            self._accounts.clear()
+        else:
+            self._accounts.pop(user_id, None)
+
+
+_leaderboard = LeaderboardIndex()
+_accounts = AccountCache()
+_ledgers: "weakref.WeakSet[BalanceLedger]" = weakref.WeakSet()
+# Held while a balance is read and changed, both by the functions below and by ledger flushes
+_balance_locks = UserLocks()
+
+
+def _account_changed(user_id: Union[int, str], **values) -> None:
+    user_id = int(user_id)
+    _accounts.update(user_id, **values)
+    _leaderboard.update(user_id, **values)
+
+
+def _pending(user_id: int, _forced: bool = False) -> int:
+    """Return the income waiting in the ledgers for ``user_id``, in the bank being read"""
+    if not _ledgers or _get_config(_forced) is not _get_config():
+        return 0
+    return sum(ledger.pending(user_id) for ledger in _ledgers)
+
+
+def _discard_pending(user_id: int = None, _forced: bool = False, amount: int = None) -> None:
+    """Drop the income waiting for ``user_id``, or for everyone, once the balance is replaced.
+
+    If ``amount`` is given, only that much is dropped, so that income credited after the balance
+    was read is kept."""
+    if _ledgers and _get_config(_forced) is _get_config():
+        for ledger in _ledgers:
+            if amount is None:
+                ledger.discard(user_id)
+            else:
+                amount -= ledger.discard(user_id, amount)
+
+
+async def _settle_pending(user_id: int, _forced: bool = False) -> None:
+    """Write the income waiting for ``user_id``, for code that reads the bank directly.
+
+    The caller must hold ``_balance_locks(user_id)``."""
+    if _ledgers and _get_config(_forced) is _get_config():
+        for ledger in list(_ledgers):
+            await ledger.settle(user_id)
+
+
 def _init(bot: Red):
     global _config, _bot
     if _config is None:
@@ -134,8 +304,19 @@ async def get_balance(member: discord.Member, _forced: bool = False) -> int:
     int
         The member's balance
     """
+    balance, _ = await _get_balance(member, _forced)
+    return balance
+
+
+async def _get_balance(member: discord.Member, _forced: bool = False) -> Tuple[int, int]:
+    """Return the balance of ``member``, and how much of it is income the ledgers hold"""
     acc = await get_account(member, _forced=_forced)
-    return int(acc.balance)
+    balance = int(acc.balance)
+    pending = _pending(member.id, _forced)
+    if pending:
+        # Income that the ledger has not written yet counts already, as it will on writing
+        balance = min(balance + pending, await get_max_balance(getattr(member, "guild", None)))
+    return int(balance), pending
 
 
 async def get_next_payday(member: discord.Member) -> int:
@@ -174,6 +355,7 @@ async def set_next_payday(member: Union[discord.Member, discord.User], amount: i
     amount = int(amount)
     group = _config.user(member)
     await group.next_payday.set(amount)
+    _account_changed(member.id, next_payday=amount)
     return amount
 
 
@@ -218,8 +400,24 @@ async def set_balance(
         If attempting to set the balance to a value greater than
         ``bank._MAX_BALANCE``.
     """
+    async with _balance_locks(member.id):
+        return await _set_balance(member, amount, _forced)
+
+
+async def _set_balance(
+    member: Union[discord.Member, discord.User],
+    amount: int,
+    _forced: bool = False,
+    counted: int = None,
+) -> int:
+    """`set_balance` for callers holding ``_balance_locks(member.id)``.
+
+    ``counted`` is the pending income that the new balance was worked out from, which is all of
+    it if not given.  It is dropped once the balance is written."""
     if _forced or (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
-        return await bank.set_balance(member=member, amount=amount)
+        amount = await bank.set_balance(member=member, amount=amount)
+        _discard_pending(member.id, _forced, counted)
+        return amount
 
     guild = getattr(member, "guild", None)
     max_bal = await get_max_balance(guild)
@@ -231,6 +429,8 @@ async def set_balance(
     amount = int(amount)
     group = _config.user(member)
     await group.balance.set(amount)
+    _discard_pending(member.id, amount=counted)
+    _account_changed(member.id, balance=amount)
     return amount
 
 
@@ -255,21 +455,25 @@ async def withdraw_credits(member: discord.Member, amount: int, _forced: bool =
         If the withdrawal amount is not an `int`.
     """
     if _forced or (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
-        return await bank.withdraw_credits(member=member, amount=amount)
+        async with _balance_locks(member.id):
+            # Red's bank only sees what is written, while get_balance counted the pending income
+            await _settle_pending(member.id, _forced)
+            return await bank.withdraw_credits(member=member, amount=amount)
 
     if not isinstance(amount, (int, float)):
         raise TypeError("Withdrawal amount must be of type int, not {}.".format(type(amount)))
     amount = int(amount)
-    bal = await get_balance(member)
-    if amount > bal:
-        raise ValueError(
-            "Insufficient funds {} > {}".format(
-                humanize_number(amount, override_locale="en_US"),
-                humanize_number(bal, override_locale="en_US"),
+    async with _balance_locks(member.id):
+        bal, counted = await _get_balance(member)
+        if amount > bal:
+            raise ValueError(
+                "Insufficient funds {} > {}".format(
+                    humanize_number(amount, override_locale="en_US"),
+                    humanize_number(bal, override_locale="en_US"),
+                )
             )
-        )
 
-    return await set_balance(member, bal - amount)
+        return await _set_balance(member, bal - amount, counted=counted)
 
 
 async def deposit_credits(member: discord.Member, amount: int, _forced: bool = False) -> int:
@@ -292,12 +496,14 @@ async def deposit_credits(member: discord.Member, amount: int, _forced: bool = F
         If the deposit amount is not an `int`.
     """
     if _forced or (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
-        return await bank.deposit_credits(member=member, amount=amount)
+        async with _balance_locks(member.id):
+            return await bank.deposit_credits(member=member, amount=amount)
     if not isinstance(amount, (int, float)):
         raise TypeError("Deposit amount must be of type int, not {}.".format(type(amount)))
     amount = int(amount)
-    bal = int(await get_balance(member))
-    return await set_balance(member, amount + bal)
+    async with _balance_locks(member.id):
+        bal, counted = await _get_balance(member)
+        return await _set_balance(member, amount + bal, counted=counted)
 
 
 async def transfer_credits(
@@ -360,12 +566,43 @@ async def wipe_bank(guild: Optional[discord.Guild] = None) -> None:
         per-server, all accounts in every guild will be wiped.
     """
     if (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
+        _discard_pending()
         return await bank.wipe_bank(guild=guild)
+    _discard_pending()
     await _config.clear_all_users()
-
-
-async def bank_prune(bot: Red, guild: discord.Guild = None, user_id: int = None) -> None:
+    _accounts.invalidate()
+    _leaderboard.invalidate()
+
+
+async def member_ids(bot: Red, guild: discord.Guild = None) -> Set[int]:
+    """Return the IDs of every member the bot can see, or of the members of ``guild``.
+
+    Large guilds whose members have not all been received yet are chunked first.  Members of
+    unavailable guilds are left out."""
+    guilds = [guild] if guild is not None else bot.guilds
+    ids = set()
+    async for g in AsyncIter(guilds, steps=100):
+        if g.unavailable:
+            continue
+        if g.large and not g.chunked:
+            await g.chunk()
+        ids.update(member.id for member in g.members)
+    return ids
+
+
+async def bank_prune(
+    bot: Red,
+    guild: discord.Guild = None,
+    user_id: int = None,
+    *,
+    batch_size: int = 1000,
+    progress: Callable[[int, int], Awaitable[None]] = None,
+) -> int:
     """Prune bank accounts from the bank.
+    Every stale account is cleared on its own, so the accounts that are kept are never
+    rewritten.  Accounts are handled in batches of ``batch_size``, and progress is reported and
+    the event loop is yielded to after every batch.  An interrupted prune therefore keeps what
+    it already deleted, and running it again carries on with the accounts that are left.
     Parameters
     ----------
     bot : Red
@@ -376,6 +613,15 @@ async def bank_prune(bot: Red, guild: discord.Guild = None, user_id: int = None)
         The id of the user whose account will be pruned.
         If supplied this will prune only this user's bank account
         otherwise it will prune all invalid users from the bank.
+    batch_size : int
+        The number of accounts to delete between progress reports.
+    progress : Callable[[int, int], Awaitable[None]]
+        Awaited after every batch with the number of accounts pruned so far and the total
+        number being pruned.
+    Returns
+    -------
+    int
+        The number of accounts that were pruned.
     Raises
     ------
     BankPruneError
@@ -384,32 +630,29 @@ async def bank_prune(bot: Red, guild: discord.Guild = None, user_id: int = None)
     if (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
         return await bank.bank_prune(bot=bot, guild=guild, user_id=user_id)
 
-    _guilds = set()
-    _uguilds = set()
-    if user_id is None:
-        async for g in AsyncIter(bot.guilds, steps=100):
-            if not g.unavailable and g.large and not g.chunked:
-                _guilds.add(g)
-            elif g.unavailable:
-                _uguilds.add(g)
     group = _config._get_base_group(_config.USER)
-
-    if user_id is None:
-        await bot.request_offline_members(*_guilds)
-        accounts = await group.all()
-        tmp = accounts.copy()
-        members = bot.get_all_members()
-        user_list = {str(m.id) for m in members if m.guild not in _uguilds}
-
-    async with group.all() as bank_data:  # FIXME: use-config-bulk-update
-        if user_id is None:
-            for acc in tmp:
-                if acc not in user_list:
-                    del bank_data[acc]
-        else:
-            user_id = str(user_id)
-            if user_id in bank_data:
-                del bank_data[user_id]
+    if user_id is not None:
+        stale = [int(user_id)]
+    else:
+        # The separate economy is global, so an account is kept if its user is in any guild
+        accounts = {int(account) for account in await group.all()}
+        stale = sorted(accounts - await member_ids(bot))
+
+    pruned = 0
+    for start in range(0, len(stale), batch_size):
+        batch = stale[start : start + batch_size]
+        for account in batch:
+            # Held so that a ledger flush cannot write the balance back meanwhile
+            async with _balance_locks(account):
+                await group.clear_raw(str(account))
+                _discard_pending(account)
+            _accounts.invalidate(account)
+            _leaderboard.remove(account)
+        pruned += len(batch)
+        if progress is not None:
+            await progress(pruned, len(stale))
+        await asyncio.sleep(0)
+    return pruned
 
 
 async def get_leaderboard(
@@ -435,17 +678,9 @@ async def get_leaderboard(
     """
     if _forced or (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
         return await bank.get_leaderboard(positions=positions, guild=guild)
-    raw_accounts = await _config.all_users()
-    if guild is not None:
-        tmp = raw_accounts.copy()
-        for acc in tmp:
-            if not guild.get_member(acc):
-                del raw_accounts[acc]
-    sorted_acc = sorted(raw_accounts.items(), key=lambda x: x[1]["balance"], reverse=True)
-    if positions is None:
-        return sorted_acc
-    else:
-        return sorted_acc[:positions]
+    await _leaderboard.load()
+    members = None if guild is None else {member.id for member in guild.members}
+    return _leaderboard.top(positions, members)
 
 
 async def get_leaderboard_position(
@@ -466,6 +701,10 @@ async def get_leaderboard_position(
     TypeError
         If the bank is currently guild-specific and a `discord.User` object was passed in
     """
+    if not _forced and (cog := _bot.get_cog("Adventure")) is not None and cog._separate_economy:
+        # The separate economy is always global
+        await _leaderboard.load()
+        return _leaderboard.rank(member.id)
     if await is_global():
         guild = None
     else:
@@ -499,11 +738,7 @@ async def get_account(
     if _forced or (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
         return await bank.get_account(member)
 
-    all_accounts = await _config.all_users()
-    if member.id not in all_accounts:
-        acc_data = {"balance": 250, "next_payday": 0}
-    else:
-        acc_data = all_accounts[member.id]
+    acc_data = await _accounts.get(member.id)
     return AdventureAccount(**acc_data)
 
 
@@ -768,6 +1003,121 @@ def cost(amount: int):
             return coro_or_command
 
 
+class BalanceLedger:
+    """A write-behind ledger for balance changes.
+
+    Changes are added up in memory, and only the accounts that changed are read and written
+    when the ledger is flushed, one balance at a time, yielding every ``batch_size`` accounts.
+    The rest of the bank is never read, so a flush costs in proportion to the number of
+    earners.  The max balance is applied when the changes are written, so it is checked against
+    the account's balance at that time.
+
+    Changes count towards `get_balance` until they are written, and are dropped when a balance
+    is set outright, so a reset or recreated account never receives income from before.  An
+    account is only written while holding its balance lock, so a flush never overwrites a
+    balance that this module is changing at the same time."""
+
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+        self._deltas: Dict[str, int] = {}
+        # Changes taken by a flush that is still running, until they are written
+        self._flushing: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        _ledgers.add(self)
+
+    def __len__(self) -> int:
+        return len(self._deltas)
+
+    def credit(self, user_id: Union[int, str], amount: int) -> None:
+        if amount:
+            user_id = str(user_id)
+            self._deltas[user_id] = self._deltas.get(user_id, 0) + amount
+
+    def pending(self, user_id: Union[int, str]) -> int:
+        """Return the change waiting to be written to the account of ``user_id``"""
+        user_id = str(user_id)
+        return self._deltas.get(user_id, 0) + self._flushing.get(user_id, 0)
+
+    def discard(self, user_id: Union[int, str] = None, amount: int = None) -> int:
+        """Drop the changes waiting for ``user_id``, or for everyone.
+
+        If ``amount`` is given, at most that much is dropped and the rest is kept for the next
+        flush.  Returns how much was dropped."""
+        if user_id is None:
+            dropped = sum(self._deltas.values()) + sum(self._flushing.values())
+            self._deltas.clear()
+            self._flushing.clear()
+            return dropped
+        user_id = str(user_id)
+        pending = self.pending(user_id)
+        dropped = pending if amount is None else min(amount, pending)
+        self._deltas.pop(user_id, None)
+        self._flushing.pop(user_id, None)
+        if pending - dropped:
+            self._deltas[user_id] = pending - dropped
+        return dropped
+
+    @staticmethod
+    async def _write(users, user_id: str, delta: int, max_credits: int) -> int:
+        balance = await users.get_raw(user_id, "balance", default=0)
+        balance = int(min(balance + delta, max_credits))
+        await users.set_raw(user_id, "balance", value=balance)
+        return balance
+
+    async def settle(self, user_id: Union[int, str]) -> None:
+        """Write the change waiting for ``user_id`` at once.
+
+        The caller must hold ``_balance_locks(user_id)``."""
+        user_id = str(user_id)
+        delta = self.pending(user_id)
+        if not delta:
+            return
+        config = _get_config()
+        users = config._get_base_group(config.USER)
+        balance = await self._write(users, user_id, delta, await get_max_balance())
+        self.discard(user_id, delta)
+        if config is _config:
+            _account_changed(user_id, balance=balance)
+
+    async def flush(self) -> int:
+        """Write every pending change to the bank.
+
+        Returns
+        -------
+        int
+            The number of accounts that were written.
+        """
+        async with self._lock:
+            if not self._deltas:
+                return 0
+            self._flushing, self._deltas = self._deltas, {}
+            config = _get_config()
+            users = config._get_base_group(config.USER)
+            max_credits = await get_max_balance()
+            written = 0
+            try:
+                for index, user_id in enumerate(list(self._flushing), 1):
+                    async with _balance_locks(int(user_id)):
+                        # It is gone if the balance was set or settled while waiting
+                        delta = self._flushing.get(user_id)
+                        if delta is None:
+                            continue
+                        balance = await self._write(users, user_id, delta, max_credits)
+                        # Only now that it is written does it stop counting as pending
+                        self._flushing.pop(user_id, None)
+                    if config is _config:
+                        _account_changed(user_id, balance=balance)
+                    written += 1
+                    if index % self.batch_size == 0:
+                        await asyncio.sleep(0)
+            finally:
+                # Keep whatever could not be written for the next flush
+                flushing, self._flushing = self._flushing, {}
+                for user_id, delta in flushing.items():
+                    self.credit(user_id, delta)
+            return written
+
+
 def _get_config(_forced: bool = False):
     if _forced or (cog := _bot.get_cog("Adventure")) is None or not cog._separate_economy:
         return bank._config
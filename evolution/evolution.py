@@ -24,27 +24,30 @@ SOFTWARE.
 
 import asyncio
 import copy
+import io
+import json
 import math
-import random
+import time
 import traceback
-from collections import defaultdict
-from datetime import timedelta
-from typing import Literal, Optional
+from typing import Literal, Optional, Union
 
 import discord
 from redbot.core import Config, commands, errors
 from redbot.core.bot import Red
 from redbot.core.utils import AsyncIter
-from redbot.core.utils.chat_formatting import box, humanize_number, humanize_timedelta, inline
-from redbot.core.utils.menus import DEFAULT_CONTROLS, menu, start_adding_reactions
+from redbot.core.utils.chat_formatting import box, humanize_number, inline, pagify
+from redbot.core.utils.menus import start_adding_reactions
 from redbot.core.utils.predicates import ReactionPredicate
 
 from tabulate import tabulate
 
+from .locks import InFlight, UserLocks
+from .menus import BackyardSource, EvolutionMenu, ShopSource
+from .state import PlayerStore
 from .tasks import EvolutionTaskManager
 from .utils import EvolutionUtils
 
-from . import bank
+from . import bank, rules
 
 ANIMALS = ["chicken", "dog", "cat", "shark", "tiger", "penguin", "pupper", "dragon"]
 
@@ -68,27 +71,25 @@ class Evolution(commands.Cog):
     def __init__(self, bot):
         self.bot: Red = bot
 
-        self.lock = asyncio.Lock()
+        self.locks = UserLocks()
+        self.inmarket = InFlight()
         self.conf: Config = Config.get_conf(self, identifier=473541068378341376)
-        self.cache = defaultdict(self.cache_defaults)  # Thanks to Theelx#4980
 
         self.utils: EvolutionUtils = EvolutionUtils(self)
-        self.task_manager: EvolutionTaskManager = EvolutionTaskManager(self)
-
         self.utils.init_config()
-        self.task_manager.init_tasks()
+        self.players: PlayerStore = PlayerStore(self.conf)
 
-        self.inmarket = []
+        self.task_manager: EvolutionTaskManager = EvolutionTaskManager(self)
+        self.task_manager.init_tasks()
 
-    def cache_defaults(self):
-        return {"animal": "", "animals": {}, "multiplier": 1.0, "bought": {}}
+        self.bot.register_rpc_handler(self.task_metrics)
 
-    def cog_unload(self):
-        self.__unload()
+    async def cog_unload(self):
+        await self.__unload()
 
-    def __unload(self):
-        self.cache.clear()
-        self.task_manager.shutdown()
+    async def __unload(self):
+        self.bot.unregister_rpc_handler(self.task_metrics)
+        await self.task_manager.shutdown()
 
     async def red_delete_data_for_user(
         self,
@@ -98,14 +99,7 @@ class Evolution(commands.Cog):
     ):
         """This cog stores game data by user ID.  It will delete the user's game data,
         reset their progress and wipe traces of their ID."""
-        await self.conf.user_from_id(user_id).clear()
-
-        try:
-            del self.cache[user_id]
-        except KeyError:
-            pass
-
-        return
+        await self.players.delete(user_id)
 
     @commands.group(aliases=["e", "evo"])
     async def evolution(self, ctx):
@@ -141,30 +135,82 @@ class Evolution(commands.Cog):
         message = self.utils.format_task(statuses["income"])
         await ctx.send(message)
 
+    @tasks.command()
+    async def metrics(self, ctx, raw: bool = False):
+        """View how long the background tasks take, and what they did.
+
+        Pass true to get the metrics as JSON instead.  The same data is available to dashboards
+        through the `EVOLUTION__TASK_METRICS` RPC method."""
+        metrics = self.task_manager.get_metrics()
+        if raw:
+            data = json.dumps(metrics, indent=4).encode("utf-8")
+            return await ctx.send(file=discord.File(io.BytesIO(data), filename="metrics.json"))
+        for page in pagify(self.utils.format_metrics(metrics), delims=["\n\n"]):
+            await ctx.send(box(page, lang="css"))
+
+    async def task_metrics(self) -> dict:
+        """RPC handler returning the metrics of the background tasks"""
+        return self.task_manager.get_metrics()
+
+    @tasks.command()
+    async def ledger(self, ctx, interval: int = None):
+        """Check or set how often income is written to the bank, in seconds.
+
+        Income is collected in memory and only the accounts that earned something are written,
+        once per interval and when the cog is unloaded."""
+        if interval is None:
+            interval = await self.conf.ledgerinterval()
+            return await ctx.send(
+                f"Income is written every {humanize_number(interval)} seconds.  "
+                f"{humanize_number(len(self.task_manager.ledger))} accounts are waiting to be "
+                "written."
+            )
+        if interval < 1:
+            return await ctx.send("The interval must be at least 1 second.")
+        await self.conf.ledgerinterval.set(interval)
+        await ctx.tick()
+
     @commands.is_owner()
     @evolution.command(hidden=True)
     async def removeuser(self, ctx, user: discord.User):
         """Removes a user from the market place if they are stuck for some reason.
 
         Only use this if you have to, otherwise things could break"""
-        try:
-            self.inmarket.remove(user.id)
-        except ValueError:
+        if not self.inmarket.discard(user.id):
             return await ctx.send("The user is not in the marketplace")
         await ctx.tick()
 
+    @commands.is_owner()
+    @evolution.command(hidden=True)
+    async def prunebank(self, ctx):
+        """Delete the bank accounts of users who no longer share a server with the bot.
+
+        Stale accounts are deleted in batches of 1,000, with progress shown after each batch.
+        If this gets interrupted, run it again to carry on."""
+        message = await ctx.send("Pruning the bank...")
+        last = time.monotonic()
+
+        async def progress(pruned, total):
+            nonlocal last
+            if time.monotonic() - last >= 2:
+                last = time.monotonic()
+                pruned, total = humanize_number(pruned), humanize_number(total)
+                await message.edit(content=f"Pruned {pruned}/{total} accounts...")
+
+        pruned = await bank.bank_prune(self.bot, progress=progress)
+        if pruned is None:  # Using Red's bank, which does not count
+            return await message.edit(content="The bank has been pruned.")
+        await message.edit(content=f"Pruned {humanize_number(pruned)} accounts.")
+
     @evolution.command()
     async def start(self, ctx):
         """Start your adventure..."""
-        # No locks are needed here because they are all being used with values that don't change,
-        # or shouldn't be changing at the moment
-        animal = await self.conf.user(ctx.author).animal()
-        if animal != "":
-            return await ctx.send("You have already started your evolution.")
+        animal = self.players.get(ctx.author.id)["animal"]
         if animal == "P":
             return await ctx.send("You are starting your evolution.")
-        async with self.lock:
-            await self.conf.user(ctx.author).animal.set("P")
+        if animal != "":
+            return await ctx.send("You have already started your evolution.")
+        self.players.update(ctx.author.id, animal="P")
         await ctx.send(
             f"Hello there.  Welcome to Evolution, where you can buy animals to earn credits for economy.  What would you like your animals to be named (singular please)?  Warning: this cannot be changed.  Here is a list of the current available ones: `{'`, `'.join(ANIMALS)}`"
         )
@@ -179,15 +225,9 @@ class Evolution(commands.Cog):
         try:
             message = await self.bot.wait_for("message", check=check, timeout=30.0)
         except asyncio.TimeoutError:
-            async with self.lock:
-                await self.conf.user(ctx.author).animal.set("")
+            self.players.update(ctx.author.id, animal="")
             return await ctx.send("Command timed out.")
-        async with self.lock:
-            async with self.conf.user(ctx.author).all() as data:
-                data["animal"] = message.content.lower()
-                data["animals"] = {1: 1}
-
-                self.cache[ctx.author.id] = data
+        self.players.update(ctx.author.id, animal=message.content.lower(), animals={"1": 1})
         await ctx.send(
             f"Your animal has been set to {message.content}.  You have been granted one to start."
         )
@@ -202,13 +242,15 @@ class Evolution(commands.Cog):
         self,
         ctx,
         level: Optional[int] = None,
-        amount: Optional[int] = 1,
+        amount: Optional[Union[int, Literal["max"]]] = 1,
         skip_confirmation: Optional[bool] = False,
     ):
         """Buy animals from the always in-stock store.
 
         While the store will always have animals for sale, you cannot buy above a certain level,
-        and they will be for a higher price."""
+        and they will be for a higher price.
+
+        Pass `max` as the amount to buy as many as you can afford and have room for."""
         if level is None:
             if ctx.channel.permissions_for(ctx.guild.me).embed_links:
                 return await self.shop(ctx)
@@ -218,127 +260,90 @@ class Evolution(commands.Cog):
                 )
         if ctx.author.id in self.inmarket:
             return await ctx.send("Complete your current transaction or evolution first.")
-        self.inmarket.append(ctx.author.id)
-        async with self.lock:
-            data = await self.conf.user(ctx.author).all()
-        animals = data["animals"]
-        bought = data["bought"]
-        animal = data["animal"]
-        multiplier = data["multiplier"]
-
-        if animal in ["", "P"]:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("Finish starting your evolution first")
-
-        highest = max(list(map(int, animals.keys())))
-        prev = int(animals.get(str(level), 0))
-        balance = await bank.get_balance(ctx.author)
-        current_bought = int(bought.get(str(level), 0))
-        price = self.utils.get_total_price(level, current_bought, amount)
-
-        e = math.ceil((multiplier - 1) * 5)
-
-        if balance < price:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send(f"You need {humanize_number(price)} credits for all of that!")
-        if prev >= 6 + e:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("You have too many of those!  Evolve some of them already.")
-        if prev + amount > 6 + e:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("You'd have too many of those!  Evolve some of them already.")
-        if level < 1:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("Ya cant buy a negative level!")
-        if amount < 1:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("Ya cant buy a negative amount!")
-        if (level > int(highest) - 3) and (level > 1):
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("Please get higher animals to buy higher levels of them.")
-        if level > 22:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("The highest level you can buy is level 22.")
-
-        if not skip_confirmation:
-            m = await ctx.send(
-                f"Are you sure you want to buy {amount} Level {str(level)} {animal}{'s' if amount != 1 else ''}?  This will cost you {humanize_number(price)}."
-            )
-            await m.add_reaction("\N{WHITE HEAVY CHECK MARK}")
-            await m.add_reaction("\N{CROSS MARK}")
-
-            def check(reaction, user):
-                return (
-                    (user.id == ctx.author.id)
-                    and (str(reaction.emoji) in ["\N{WHITE HEAVY CHECK MARK}", "\N{CROSS MARK}"])
-                    and (reaction.message.id == m.id)
+        with self.inmarket.hold(ctx.author.id):
+            data = self.players.get(ctx.author.id)
+            version = self.players.version(ctx.author.id)
+            animals = data["animals"]
+            bought = data["bought"]
+            animal = data["animal"]
+            multiplier = data["multiplier"]
+
+            if animal in ["", "P"]:
+                return await ctx.send("Finish starting your evolution first")
+
+            highest = max(list(map(int, animals.keys())))
+            prev = int(animals.get(str(level), 0))
+            balance = await bank.get_balance(ctx.author)
+            current_bought = int(bought.get(str(level), 0))
+            limit = rules.animal_limit(multiplier)
+
+            refusal = rules.buy_level_refusal(level, highest)
+            if refusal:
+                return await ctx.send(refusal)
+            if amount == "max":
+                amount = self.utils.get_max_affordable(
+                    level, current_bought, balance, limit - prev
                 )
+                if amount < 1 and prev < limit:
+                    return await ctx.send("You can't afford any of those!")
+            price = self.utils.get_total_price(level, current_bought, amount)
 
-            try:
-                reaction, user = await self.bot.wait_for("reaction_add", check=check, timeout=60.0)
-            except asyncio.TimeoutError:
-                self.inmarket.remove(ctx.author.id)
-                return await ctx.send(f"You left the {animal} shop without buying anything.")
-
-            if str(reaction.emoji) == "\N{CROSS MARK}":
-                self.inmarket.remove(ctx.author.id)
-                return await ctx.send(f"You left the {animal} shop without buying anything.")
-        animals[str(level)] = prev + amount
-        bought[level] = current_bought + 1
-
-        async with self.lock:
-            async with self.conf.user(ctx.author).all() as data:
-                data["animals"] = animals
-                data["bought"] = bought
-
-                self.cache[ctx.author.id] = data
+            if balance < price:
+                return await ctx.send(
+                    f"You need {humanize_number(price)} credits for all of that!"
+                )
+            refusal = rules.buy_amount_refusal(amount, prev, limit)
+            if refusal:
+                return await ctx.send(refusal)
 
-        await bank.withdraw_credits(ctx.author, price)
-        await ctx.send(
-            box(
-                f"[Transaction Complete]\nYou spent {humanize_number(price)} credits to buy {amount} Level {str(level)} {animal}{'s' if amount != 1 else ''}.",
-                "css",
+            if not skip_confirmation:
+                m = await ctx.send(
+                    f"Are you sure you want to buy {amount} Level {str(level)} {animal}{'s' if amount != 1 else ''}?  This will cost you {humanize_number(price)}."
+                )
+                await m.add_reaction("\N{WHITE HEAVY CHECK MARK}")
+                await m.add_reaction("\N{CROSS MARK}")
+
+                def check(reaction, user):
+                    return (
+                        (user.id == ctx.author.id)
+                        and (
+                            str(reaction.emoji) in ["\N{WHITE HEAVY CHECK MARK}", "\N{CROSS MARK}"]
+                        )
+                        and (reaction.message.id == m.id)
+                    )
+
+                try:
+                    reaction, user = await self.bot.wait_for(
+                        "reaction_add", check=check, timeout=60.0
+                    )
+                except asyncio.TimeoutError:
+                    return await ctx.send(f"You left the {animal} shop without buying anything.")
+
+                if str(reaction.emoji) == "\N{CROSS MARK}":
+                    return await ctx.send(f"You left the {animal} shop without buying anything.")
+
+            async with self.locks(ctx.author.id):
+                # Claiming from the stash can change the backyard while the balance was read
+                if self.players.version(ctx.author.id) != version:
+                    return await ctx.send("Your backyard changed meanwhile.  Please try again.")
+                await bank.withdraw_credits(ctx.author, price)
+                self.players.buy(ctx.author.id, level, amount)
+            await ctx.send(
+                box(
+                    f"[Transaction Complete]\nYou spent {humanize_number(price)} credits to buy {amount} Level {str(level)} {animal}{'s' if amount != 1 else ''}.",
+                    "css",
+                )
             )
-        )
-        self.inmarket.remove(ctx.author.id)
 
     async def shop(self, ctx, start_level: int = None):
         """Friendlier menu for displaying the animals available at the store."""
-        async with self.lock:
-            data = await self.conf.user(ctx.author).all()
+        data = self.players.get(ctx.author.id)
         animals = data["animals"]
-        bought = data["bought"]
         animal = data["animal"]
 
         if animal in ["", "P"]:
             return await ctx.send("Finish starting your evolution first")
 
-        embed_list = []
-        for x in range(1, max(list(map(int, animals.keys()))) + 1):
-            embed = discord.Embed(
-                title=f"{animal.title()} Shop", description=f"Level {str(x)}", color=0xD2B48C
-            )
-            embed.add_field(name="You currently own", value=animals.get(str(x), 0))
-            current = int(bought.get(str(x), 0))
-            embed.add_field(name="You have bought", value=current)
-            embed.add_field(
-                name="Price", value=humanize_number(self.utils.get_total_price(int(x), current, 1))
-            )
-            last = 0
-            chances = []
-            try:
-                for chance, value in self.utils.levels[int(x)].items():
-                    chances.append(f"{str(chance-last)}% chance to gain {str(value)}")
-                    last = chance
-            except KeyError:
-                chances = ["100% chance to gain 1000"]
-            embed.add_field(name="Income", value="\n".join(chances))
-            embed.add_field(
-                name="Credit delay",
-                value=humanize_timedelta(timedelta=timedelta(seconds=self.utils.delays[int(x)])),
-            )
-            embed_list.append(embed)
-
         highest_level = max([int(a) for a in animals.keys() if int(animals[a]) > 0])
         highest_level -= 3
         if start_level and not (animals.get(str(start_level), False) is False):
@@ -349,9 +354,8 @@ class Evolution(commands.Cog):
         if highest_level < 0:
             highest_level = 0
 
-        controls = dict(DEFAULT_CONTROLS)
-        controls["\N{MONEY BAG}"] = self.utils.shop_control_callback
-        await menu(ctx, embed_list, controls, page=highest_level)
+        source = ShopSource(self, data)
+        await EvolutionMenu(source, page=highest_level, cog=self).start(ctx)
 
     @market.command()
     async def daily(self, ctx):
@@ -364,8 +368,8 @@ class Evolution(commands.Cog):
             B: Already purchased
             S: Available to be bought, but will be put in stash because you either do not have the space for the, or above your level threshold
         """
-        async with self.lock:
-            data = await self.conf.user(ctx.author).all()
+        data = self.players.get(ctx.author.id)
+        version = self.players.version(ctx.author.id)
         animals = data["animals"]
         animal = data["animal"]
 
@@ -374,10 +378,10 @@ class Evolution(commands.Cog):
 
         multiplier = data["multiplier"]
         highest = max(list(map(int, animals.keys())))
-        e = 6 + math.ceil((multiplier - 1) * 5)
+        e = rules.animal_limit(multiplier)
 
         display = []
-        deals = await self.conf.daily()
+        deals = await self.task_manager.get_deals()
         for did, deal in deals.items():
             status = ""
             amount = deal["details"]["amount"]
@@ -418,60 +422,66 @@ class Evolution(commands.Cog):
 
         if ctx.author.id in self.inmarket:
             return await ctx.send("Complete your current transaction or evolution first.")
-        self.inmarket.append(ctx.author.id)
-        buying = pred.result + 1
-
-        deal = deals[str(buying)]
-        if ctx.author.id in deal["bought"]:  # ;no
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send(
-                "You already bought this deal.  You cannot buy daily deals multiple times."
-            )
-
-        level = deal["details"]["level"]
-        amount = deal["details"]["amount"]
-
-        price = self.utils.get_total_price(level, 0, amount, False) * 0.75
-        balance = await bank.get_balance(ctx.author)
+        with self.inmarket.hold(ctx.author.id):
+            if self.players.version(ctx.author.id) != version:
+                return await ctx.send("Your backyard changed meanwhile.  Please try again.")
+            if self.task_manager.deals is not deals:
+                return await ctx.send("The daily deals changed meanwhile.  Please try again.")
+            buying = pred.result + 1
+
+            deal = deals[str(buying)]
+            if ctx.author.id in deal["bought"]:  # ;no
+                return await ctx.send(
+                    "You already bought this deal.  You cannot buy daily deals multiple times."
+                )
 
-        if balance < price:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send(
-                f"You need {humanize_number(price - balance)} more credits to buy that deal."
-            )
+            level = deal["details"]["level"]
+            amount = deal["details"]["amount"]
 
-        stashing = 0
-        delivering = amount
-        if level > int(highest) - 3 and level != 1:
-            stashing = amount
-            delivering = 0
-        elif amount + animals.get(str(level), 0) > e:
-            delivering = e - animals[str(level)]
-            stashing = amount - delivering
+            price = self.utils.get_total_price(level, 0, amount, False) * 0.75
+            balance = await bank.get_balance(ctx.author)
 
-        async with self.lock:
-            async with self.conf.user(ctx.author).all() as data:
-                data["animals"][str(level)] = animals.get(str(level), 0) + delivering
+            if balance < price:
+                return await ctx.send(
+                    f"You need {humanize_number(price - balance)} more credits to buy that deal."
+                )
 
+            stashing = 0
+            delivering = amount
+            if level > int(highest) - 3 and level != 1:
+                stashing = amount
+                delivering = 0
+            elif amount + animals.get(str(level), 0) > e:
+                delivering = e - animals[str(level)]
+                stashing = amount - delivering
+
+            async with self.locks(ctx.author.id):
+                # Claiming from the stash can change the backyard while the balance was read
+                if self.players.version(ctx.author.id) != version:
+                    return await ctx.send("Your backyard changed meanwhile.  Please try again.")
+                await bank.withdraw_credits(ctx.author, int(price))
+                animals[str(level)] = animals.get(str(level), 0) + delivering
+                stash = data["stash"]
                 if stashing:
-                    current_stash = data["stash"]["animals"].get(str(level), 0)
-                    data["stash"]["animals"][str(level)] = current_stash + stashing
-
-                self.cache[ctx.author.id] = data
-            async with self.conf.daily() as data:  # In case someone buys at the same time, we need to re-read the data
-                data[str(buying)]["bought"].append(ctx.author.id)
-
-        await bank.withdraw_credits(ctx.author, int(price))
-        await ctx.send(
-            box(
-                (
-                    f"[Transaction Complete]\nYou spent {humanize_number(price)} credits to buy {amount} Level {str(level)} {animal}{'s' if amount != 1 else ''}."
-                    f"\n\n{delivering} have been added to your backyard, {stashing} have been sent to your stash."
-                ),
-                "css",
+                    current_stash = stash["animals"].get(str(level), 0)
+                    stash["animals"][str(level)] = current_stash + stashing
+                self.players.update(ctx.author.id, animals=animals, stash=stash)
+
+                deal["bought"].add(ctx.author.id)
+                # Other players can buy at the same time, so the deals have their own lock
+                async with self.locks("daily"):
+                    if self.task_manager.deals is deals:
+                        async with self.conf.daily() as data:
+                            data[str(buying)]["bought"].append(ctx.author.id)
+            await ctx.send(
+                box(
+                    (
+                        f"[Transaction Complete]\nYou spent {humanize_number(price)} credits to buy {amount} Level {str(level)} {animal}{'s' if amount != 1 else ''}."
+                        f"\n\n{delivering} have been added to your backyard, {stashing} have been sent to your stash."
+                    ),
+                    "css",
+                )
             )
-        )
-        self.inmarket.remove(ctx.author.id)
 
     @evolution.group()
     async def stash(self, ctx):
@@ -482,8 +492,7 @@ class Evolution(commands.Cog):
     @stash.command()
     async def view(self, ctx):
         """View the animals and perks you have in your stash"""
-        async with self.lock:
-            data = await self.conf.user(ctx.author).all()
+        data = self.players.get(ctx.author.id)
 
         animal = data["animal"]
 
@@ -525,61 +534,58 @@ class Evolution(commands.Cog):
     @claim.command()
     async def animal(self, ctx, level: int):
         """Claim animals from your stash"""
-        async with self.lock:
-            data = await self.conf.user(ctx.author).all()
+        async with self.locks(ctx.author.id):
+            data = self.players.get(ctx.author.id)
 
-        animal = data["animal"]
+            animal = data["animal"]
 
-        if animal in ["", "P"]:
-            return await ctx.send("Finish starting your evolution first")
+            if animal in ["", "P"]:
+                return await ctx.send("Finish starting your evolution first")
 
-        animals = data["animals"]
-        stash = data["stash"]
-        multiplier = data["multiplier"]
-        highest = max(list(map(int, animals.keys())))
-        e = 6 + math.ceil((multiplier - 1) * 5)
+            animals = data["animals"]
+            stash = data["stash"]
+            multiplier = data["multiplier"]
+            highest = max(list(map(int, animals.keys())))
+            e = rules.animal_limit(multiplier)
 
-        try:
-            level = int(level)
-        except ValueError:
-            return await ctx.send("Invalid level; please supply a number.")
+            try:
+                level = int(level)
+            except ValueError:
+                return await ctx.send("Invalid level; please supply a number.")
 
-        if level > 25 or level < 1:
-            return await ctx.send("Invalid level; level cannot be above 25 or below 1.")
+            if level > 25 or level < 1:
+                return await ctx.send("Invalid level; level cannot be above 25 or below 1.")
 
-        try:
-            amount = stash["animals"][str(level)]
-            assert amount != 0
-        except (KeyError, AssertionError):
-            return await ctx.send("You don't have any animals at that level in your stash.")
+            try:
+                amount = stash["animals"][str(level)]
+                assert amount != 0
+            except (KeyError, AssertionError):
+                return await ctx.send("You don't have any animals at that level in your stash.")
 
-        if level > int(highest) - 3 and level != 1:
-            return await ctx.send(
-                "You are not of a required level to claim those animals from stash.  Cancelled."
-            )
+            if level > int(highest) - 3 and level != 1:
+                return await ctx.send(
+                    "You are not of a required level to claim those animals from stash.  Cancelled."
+                )
 
-        if animals.get(str(level), 0) == e:
-            return await ctx.send(
-                f"You already have the max amount of Level {level} animals in your backyard.  Cancelled."
-            )
+            if animals.get(str(level), 0) == e:
+                return await ctx.send(
+                    f"You already have the max amount of Level {level} animals in your backyard.  Cancelled."
+                )
 
-        async with self.lock:
-            async with self.conf.user(ctx.author).all() as new_data:
-                current = new_data["animals"].get(str(level), 0)
-                amount = new_data["stash"]["animals"][str(level)]
-                claiming = min([e - current, amount])
+            current = animals.get(str(level), 0)
+            claiming = min([e - current, amount])
 
-                full = True
-                if claiming != amount:
-                    full = False
+            full = True
+            if claiming != amount:
+                full = False
 
-                new_data["animals"][str(level)] = current + claiming
-                if amount - claiming == 0:
-                    del new_data["stash"]["animals"][str(level)]
-                else:
-                    new_data["stash"]["animals"][str(level)] = amount - claiming
+            animals[str(level)] = current + claiming
+            if amount - claiming == 0:
+                del stash["animals"][str(level)]
+            else:
+                stash["animals"][str(level)] = amount - claiming
 
-                self.cache[ctx.author.id] = new_data
+            self.players.update(ctx.author.id, animals=animals, stash=stash)
         extra = ""
         if not full:
             extra = f"There are still {amount - claiming} {animal}{'s' if claiming != 1 else ''} left in your Level {level} stash."
@@ -596,29 +602,18 @@ class Evolution(commands.Cog):
     @evolution.command(aliases=["by"])
     async def backyard(self, ctx, use_menu: bool = False):
         """Where ya animals live!  Pass 1 or true to put it in a menu."""
-        async with self.lock:
-            data = await self.conf.user(ctx.author).all()
+        data = self.players.get(ctx.author.id)
         animal = data["animal"]
         animals = data["animals"]
         multiplier = data["multiplier"]
-        e = 6 + math.ceil((multiplier - 1) * 5)
+        e = rules.animal_limit(multiplier)
 
         if animal in ["", "P"]:
             return await ctx.send("Finish starting your evolution first")
 
         if use_menu:
-            embed_list = []
-            for level, amount in animals.items():
-                if amount == 0:
-                    continue
-                embed = discord.Embed(
-                    title=f"Level {str(level)} {animal}",
-                    description=f"You have {str(amount)} Level {level} {animal}{'s' if amount != 1 else ''}",
-                    color=0xD2B48C,
-                )
-                embed.set_thumbnail(url=IMAGES[animal])
-                embed_list.append(embed)
-            await menu(ctx, embed_list, DEFAULT_CONTROLS)
+            source = BackyardSource(animal, animals, IMAGES[animal])
+            await EvolutionMenu(source).start(ctx)
         else:
             embed = discord.Embed(
                 title=f"The amount of {animal}s you have in your backyard.",
@@ -641,106 +636,68 @@ class Evolution(commands.Cog):
         """Evolve them animals to get more of da economy credits"""
         if ctx.author.id in self.inmarket:
             return await ctx.send("Complete your current transaction or evolution first.")
-        self.inmarket.append(ctx.author.id)
-        if level < 1 or amount < 1:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("Too low!")
-
-        async with self.lock:
-            data = await self.conf.user(ctx.author).all()
-        animal = data["animal"]
-        animals = data["animals"]
-        multiplier = data["multiplier"]
-
-        e = math.ceil((multiplier - 1) * 5)
-
-        if amount > (6 + e) // 2:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("Too high!")
+        with self.inmarket.hold(ctx.author.id):
+            data = self.players.get(ctx.author.id)
+            animal = data["animal"]
+            animals = data["animals"]
+            multiplier = data["multiplier"]
 
-        if animal in ["", "P"]:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("Finish starting your evolution first")
-
-        current = animals.get(str(level), 0)
-        highest = max(list(map(int, animals.keys())))
-        nextlevel = animals.get(str(level + 1), 0)
+            if animal in ["", "P"]:
+                return await ctx.send("Finish starting your evolution first")
 
-        if current < (amount * 2):
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send("You don't have enough animals at that level.")
+            current = animals.get(str(level), 0)
+            highest = max(list(map(int, animals.keys())))
+            nextlevel = animals.get(str(level + 1), 0)
 
-        if nextlevel + amount > 6 + e:
-            self.inmarket.remove(ctx.author.id)
-            return await ctx.send(
-                f"You'd have too many Level {str(level + 1)}s!  Evolve some of them instead!"
+            refusal = rules.evolve_refusal(
+                level, amount, current, nextlevel, rules.animal_limit(multiplier)
             )
-
-        found_new = False
-        recreate = False
-        currentlevelstr = str(level)
-        nextlevelstr = str(level + 1)
-
-        if level < 11:
-            number = random.randint(1, 100)
-        elif level < 21:
-            number = random.randint(1, 1000)
-        else:
-            number = random.randint(1, 10000)
-        if number == 1:
-            # Evolution is going to fail
-            number = random.randint(1, 10)
-            extra = f"Your {animal}s were successfully recovered however."
-            if number != 1:
-                animals[currentlevelstr] -= 2 * amount
-                extra = f"Your {animal}s were unable to be recovered."
-            await ctx.send(
-                box(
-                    (
-                        f"Evolution [Failed]\n\nFailed to convert {str(amount * 2)} Level {currentlevelstr} {animal}s "
-                        f"into {str(amount)} Level {nextlevelstr} {animal}{'s'if amount != 1 else ''}.  {extra}"
-                    ),
-                    lang="css",
+            if refusal:
+                return await ctx.send(refusal)
+
+            found_new = highest == level
+            currentlevelstr = str(level)
+            nextlevelstr = str(level + 1)
+
+            result = self.utils.roll_evolution(level)
+            recreate = self.players.evolve(ctx.author.id, level, amount, result)
+            if recreate:
+                async with self.locks(ctx.author.id):
+                    await bank.set_balance(ctx.author, 0)
+            if result != "success":
+                extra = f"Your {animal}s were successfully recovered however."
+                if result == "lost":
+                    extra = f"Your {animal}s were unable to be recovered."
+                await ctx.send(
+                    box(
+                        (
+                            f"Evolution [Failed]\n\nFailed to convert {str(amount * 2)} Level {currentlevelstr} {animal}s "
+                            f"into {str(amount)} Level {nextlevelstr} {animal}{'s'if amount != 1 else ''}.  {extra}"
+                        ),
+                        lang="css",
+                    )
                 )
-            )
-        else:
-            animals[currentlevelstr] -= 2 * amount
-            if highest == level:
-                found_new = True
-            animals[nextlevelstr] = animals.get(nextlevelstr, 0) + amount
-            if level + 1 == 26:
-                recreate = True
-
-            if found_new:
-                sending = "CONGRATULATIONS!  You have found a new animal!"
             else:
-                sending = ""
-            await ctx.send(
-                box(
-                    (
-                        f"Evolution #Successful\n\nSuccessfully converted {str(amount * 2)} Level {currentlevelstr} {animal}s "
-                        f"into {str(amount)} Level {nextlevelstr} {animal}{'s' if amount != 1 else ''}.\n\n{sending}"
-                    ),
-                    lang="css",
+                if found_new:
+                    sending = "CONGRATULATIONS!  You have found a new animal!"
+                else:
+                    sending = ""
+                await ctx.send(
+                    box(
+                        (
+                            f"Evolution #Successful\n\nSuccessfully converted {str(amount * 2)} Level {currentlevelstr} {animal}s "
+                            f"into {str(amount)} Level {nextlevelstr} {animal}{'s' if amount != 1 else ''}.\n\n{sending}"
+                        ),
+                        lang="css",
+                    )
                 )
-            )
-        if recreate:
-            async with self.lock:
-                async with self.conf.user(ctx.author).all() as data:
-                    multiplier = data["multiplier"]
-                    data["animals"] = {1: 1}
-                    data["multiplier"] = multiplier + 0.2
-            new = (
-                "**Report:**\n"
-                f"**To:** {ctx.author.display_name}\n"
-                f"**Concerning:** Animal experiment #{str(math.ceil(((multiplier - 1) * 5) + 1))}\n"
-                f"**Subject:** Animal experiment concluded.\n\n"
-                f"Congratulations, {ctx.author.display_name}!  You have successfully combined enough animals to reach a Level 26 Animal!  This means that it is time to recreate universe!  This will reset your bank account, remove all of your animals, but allow one more animal of every level, and give you an extra 20% income rate for the next universe from all income.  Congratulations!\n\n"
-                f"From, The Head {animal.title()}"
-            )
-            await ctx.send(new)
-            await bank.set_balance(ctx.author, 0)
-        else:
-            async with self.lock:
-                await self.conf.user(ctx.author).animals.set(animals)
-        self.inmarket.remove(ctx.author.id)
+            if recreate:
+                new = (
+                    "**Report:**\n"
+                    f"**To:** {ctx.author.display_name}\n"
+                    f"**Concerning:** Animal experiment #{str(math.ceil(((multiplier - 1) * 5) + 1))}\n"
+                    f"**Subject:** Animal experiment concluded.\n\n"
+                    f"Congratulations, {ctx.author.display_name}!  You have successfully combined enough animals to reach a Level 26 Animal!  This means that it is time to recreate universe!  This will reset your bank account, remove all of your animals, but allow one more animal of every level, and give you an extra 20% income rate for the next universe from all income.  Congratulations!\n\n"
+                    f"From, The Head {animal.title()}"
+                )
+                await ctx.send(new)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from bisect import bisect
+from typing import TYPE_CHECKING, Dict, List, Mapping, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .state import Player
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class IncomeTable:
+    """Samples the income of many animals of the same level at once.
+
+    Every minute each animal rolls a number from 1 to 100 and pays out for the lowest chance
+    in its level's table that the roll does not exceed.  So the payouts of ``count`` animals
+    of a level follow a multinomial distribution, and can be drawn in one go instead of rolling
+    for every animal.  NumPy is used for this when it is installed.  Otherwise the distribution
+    of the total income of ``count`` animals is worked out once for every level and count, and
+    each group costs a single random number looked up in it."""
+
+    # Groups bigger than this are drawn in chunks, which keeps every table small
+    CHUNK = 64
+
+    def __init__(self, levels: Dict[int, Dict[int, int]]):
+        self.payouts: Dict[int, List[int]] = {}
+        self.weights: Dict[int, List[int]] = {}
+        for level, chances in levels.items():
+            thresholds = sorted(chances)
+            self.payouts[level] = [chances[threshold] for threshold in thresholds]
+            self.weights[level] = [
+                threshold - previous for previous, threshold in zip([0] + thresholds, thresholds)
+            ]
+        self._rng = None if numpy is None else numpy.random.default_rng()
+        self._tables: Dict[Tuple[int, int], Tuple[List[int], List[float]]] = {}
+
+    async def gains(self, players: Mapping[int, Player], levels: List[int]) -> Dict[int, int]:
+        """Work out how much each of ``players`` gains from ``levels``, before their multiplier.
+
+        Animals are grouped by (player, level), and every group is sampled with a single draw.
+        The draws for a level are made for all players at once."""
+        groups: Dict[int, List[tuple]] = {level: [] for level in levels}
+        gaining = {}
+        for index, (userid, player) in enumerate(players.items(), 1):
+            gaining[userid] = 0
+            animals = player.animals
+            for level in levels:
+                amount = animals[level - 1]
+                if amount:
+                    groups[level].append((userid, amount))
+            if index % 500 == 0:
+                await asyncio.sleep(0)
+
+        for level, group in groups.items():
+            if not group:
+                continue
+            owners, amounts = zip(*group)
+            for userid, income in zip(owners, self.draw(level, amounts)):
+                gaining[userid] += income
+            await asyncio.sleep(0)
+        return gaining
+
+    def draw(self, level: int, counts: Sequence[int]) -> List[int]:
+        """Return the income of each group of ``counts`` animals of ``level``"""
+        if not counts:
+            return []
+        payouts, weights = self.payouts[level], self.weights[level]
+        if len(payouts) == 1:
+            return [count * payouts[0] for count in counts]
+        if self._rng is not None:
+            probabilities = numpy.array(weights) / sum(weights)
+            draws = self._rng.multinomial(numpy.array(counts, dtype=numpy.int64), probabilities)
+            return (draws @ numpy.array(payouts, dtype=numpy.int64)).tolist()
+        tables, random_ = self._tables, random.random
+        incomes = []
+        for count in counts:
+            income = 0
+            while count > 0:
+                chunk = min(count, self.CHUNK)
+                table = tables.get((level, chunk))
+                if table is None:
+                    table = self._table(level, chunk)
+                totals, cumulative = table
+                income += totals[min(bisect(cumulative, random_()), len(totals) - 1)]
+                count -= chunk
+            incomes.append(income)
+        return incomes
+
+    def _table(self, level: int, count: int) -> Tuple[List[int], List[float]]:
+        """Return every total ``count`` animals of ``level`` can pay out, and the cumulative
+        chance of each one.  The tables for smaller counts are built and kept on the way."""
+        payouts, weights = self.payouts[level], self.weights[level]
+        # How many of the sum(weights) ** n equally likely rolls give each total
+        ways = {0: 1}
+        for n in range(1, count + 1):
+            combined: Dict[int, int] = {}
+            for total, number in ways.items():
+                for payout, weight in zip(payouts, weights):
+                    combined[total + payout] = combined.get(total + payout, 0) + number * weight
+            ways = combined
+            if (level, n) not in self._tables:
+                totals = sorted(ways)
+                rolls, running, cumulative = sum(weights) ** n, 0, []
+                for total in totals:
+                    running += ways[total]
+                    cumulative.append(running / rolls)
+                self._tables[(level, n)] = (totals, cumulative)
+        return self._tables[(level, count)]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import weakref
+from typing import Hashable, Iterator, Set
+
+
+class UserLocks:
+    """One lock per user, so different players never wait on each other.
+
+    Locks are only weakly referenced here.  A lock stays alive while some task holds or waits
+    for it, and is dropped once nobody refers to it anymore, so idle players cost nothing."""
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[Hashable, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def __call__(self, key: Hashable) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+
+class InFlight:
+    """The users who are in the middle of a transaction or an evolution"""
+
+    def __init__(self):
+        self._users: Set[int] = set()
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @contextlib.contextmanager
+    def hold(self, user_id: int) -> Iterator[None]:
+        """Mark ``user_id`` as busy until the block is left, however it is left"""
+        self._users.add(user_id)
+        try:
+            yield
+        finally:
+            self._users.discard(user_id)
+
+    def discard(self, user_id: int) -> bool:
+        """Forget about ``user_id``, returning whether it was busy"""
+        if user_id not in self._users:
+            return False
+        self._users.discard(user_id)
+        return True
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+import discord
+from redbot.core.utils.chat_formatting import humanize_number
+from redbot.vendored.discord.ext import menus
+
+if TYPE_CHECKING:
+    from .evolution import Evolution
+
+
+class EvolutionMenu(menus.MenuPages, inherit_buttons=False):
+    """A menu that only builds the page that is being shown, and can start on any page.
+
+    If ``cog`` is given, the pages are store levels and a button to buy the shown level is
+    added."""
+
+    def __init__(
+        self, source: menus.PageSource, page: int = 0, cog: Evolution = None, **kwargs: Any
+    ):
+        super().__init__(source, clear_reactions_after=True, timeout=60, **kwargs)
+        self.current_page = page
+        self.cog = cog
+
+    async def send_initial_message(self, ctx, channel):
+        page = await self._source.get_page(self.current_page)
+        kwargs = await self._get_kwargs_from_page(page)
+        return await channel.send(**kwargs)
+
+    @menus.button("\N{LEFTWARDS BLACK ARROW}\N{VARIATION SELECTOR-16}", position=menus.First(0))
+    async def prev(self, payload: discord.RawReactionActionEvent):
+        if self.current_page == 0:
+            await self.show_page(self._source.get_max_pages() - 1)
+        else:
+            await self.show_checked_page(self.current_page - 1)
+
+    @menus.button("\N{CROSS MARK}", position=menus.First(1))
+    async def stop_pages_default(self, payload: discord.RawReactionActionEvent) -> None:
+        self.stop()
+        await self.message.delete()
+
+    @menus.button("\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}", position=menus.First(2))
+    async def next(self, payload: discord.RawReactionActionEvent):
+        if self.current_page == self._source.get_max_pages() - 1:
+            await self.show_page(0)
+        else:
+            await self.show_checked_page(self.current_page + 1)
+
+    @menus.button("\N{MONEY BAG}", position=menus.Last(0), skip_if=lambda menu: menu.cog is None)
+    async def buy(self, payload: discord.RawReactionActionEvent):
+        level = self._source.entries[self.current_page]
+        self.bot.loop.create_task(self.ctx.invoke(self.cog.store, level=level))
+
+
+class ShopSource(menus.ListPageSource):
+    """The store's levels.  The text that is the same for every player is built once by
+    `EvolutionUtils`, so a page only has to fill in what the player owns and has bought."""
+
+    def __init__(self, cog: Evolution, data: dict):
+        highest = max(map(int, data["animals"].keys()))
+        super().__init__(list(range(1, highest + 1)), per_page=1)
+        self.cog = cog
+        self.data = data
+
+    def is_paginating(self):
+        return True  # So the buy button is always added
+
+    async def format_page(self, menu: EvolutionMenu, level: int):
+        animal = self.data["animal"]
+        current = int(self.data["bought"].get(str(level), 0))
+        chances, delay = self.cog.utils.level_info[level]
+        embed = discord.Embed(
+            title=f"{animal.title()} Shop", description=f"Level {level}", color=0xD2B48C
+        )
+        embed.add_field(name="You currently own", value=self.data["animals"].get(str(level), 0))
+        embed.add_field(name="You have bought", value=current)
+        embed.add_field(
+            name="Price", value=humanize_number(self.cog.utils.get_total_price(level, current, 1))
+        )
+        embed.add_field(name="Income", value=chances)
+        embed.add_field(name="Credit delay", value=delay)
+        return embed
+
+
+class BackyardSource(menus.ListPageSource):
+    def __init__(self, animal: str, animals: Dict[str, int], image: str):
+        entries = [(level, amount) for level, amount in animals.items() if amount]
+        super().__init__(entries, per_page=1)
+        self.animal = animal
+        self.image = image
+
+    async def format_page(self, menu: EvolutionMenu, entry: Tuple[str, int]):
+        level, amount = entry
+        animal = self.animal
+        embed = discord.Embed(
+            title=f"Level {level} {animal}",
+            description=f"You have {amount} Level {level} {animal}{'s' if amount != 1 else ''}",
+            color=0xD2B48C,
+        )
+        embed.set_thumbnail(url=self.image)
+        return embed
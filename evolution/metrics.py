@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class TaskMetrics:
+    """Measurements of the runs of one background task.
+
+    Totals are kept since the cog was loaded, and the latency statistics and histogram over the
+    last ``window`` runs, so that a slow tick shows up instead of being averaged away."""
+
+    def __init__(self, window: int = 500):
+        self.runs = 0
+        self.users = 0
+        self.minted = 0
+        self.last: Optional[dict] = None
+        self._durations: Deque[float] = deque(maxlen=window)
+
+    def record(
+        self,
+        started: float,
+        lag: float = 0.0,
+        users: int = 0,
+        minted: float = 0,
+        write: float = 0.0,
+    ) -> None:
+        """Record a run that started at ``started``, a `time.perf_counter` value.
+
+        ``lag`` is how late the run started, ``write`` how long it spent writing to Config."""
+        duration = time.perf_counter() - started
+        self.runs += 1
+        self.users += users
+        self.minted += minted
+        self._durations.append(duration)
+        self.last = {
+            "at": time.time(),
+            "duration": duration,
+            "lag": lag,
+            "users": users,
+            "minted": minted,
+            "write": write,
+        }
+
+    def histogram(self) -> Dict[str, int]:
+        counts = [0] * (len(BUCKETS) + 1)
+        for duration in self._durations:
+            counts[bisect_left(BUCKETS, duration * 1000)] += 1
+        labels = [f"<={bucket}ms" for bucket in BUCKETS] + [f">{BUCKETS[-1]}ms"]
+        return dict(zip(labels, counts))
+
+    def snapshot(self) -> dict:
+        """Return every measurement as plain data, ready to be serialized"""
+        durations = sorted(self._durations)
+        latency = {}
+        if durations:
+            latency = {
+                "mean": sum(durations) / len(durations),
+                "p50": durations[len(durations) // 2],
+                "p95": durations[min(int(len(durations) * 0.95), len(durations) - 1)],
+                "max": durations[-1],
+            }
+        return {
+            "runs": self.runs,
+            "users": self.users,
+            "minted": self.minted,
+            "last": self.last,
+            "latency": latency,
+            "histogram": self.histogram(),
+        }
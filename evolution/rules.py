@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import math
+import random
+from typing import Dict, Optional
+
+# For every level, the chance out of 100 that an animal rolls at most, and what it then pays
+INCOME: Dict[int, Dict[int, int]] = {
+    1: {100: 10},
+    2: {90: 10, 100: 100},
+    3: {80: 10, 100: 100},
+    4: {70: 10, 100: 100},
+    5: {60: 10, 100: 100},
+    6: {50: 10, 90: 100, 100: 1000},
+    7: {40: 10, 80: 100, 100: 1000},
+    8: {30: 10, 70: 100, 100: 1000},
+    9: {20: 10, 60: 100, 100: 1000},
+    10: {10: 10, 50: 100, 100: 1000},
+    11: {40: 100, 90: 1000, 100: 1500},
+    12: {30: 100, 80: 1000, 100: 1500},
+    13: {20: 100, 70: 1000, 100: 1500},
+    14: {10: 100, 60: 1000, 100: 1500},
+    15: {50: 1000, 100: 1500},
+    16: {40: 1000, 100: 1500},
+    17: {30: 1000, 100: 1500},
+    18: {20: 1000, 100: 1500},
+    19: {10: 1000, 100: 1500},
+    20: {90: 1500, 100: 2000},
+    21: {80: 1500, 100: 2000},
+    22: {70: 1500, 100: 2000},
+    23: {60: 1500, 100: 2000},
+    24: {50: 1500, 100: 2000},
+    25: {100: 2000},
+}
+
+# Seconds between the payouts of every level
+DELAYS: Dict[int, int] = {
+    1: 86400,  # 24 hours
+    2: 64800,  # 18 hours
+    3: 43200,  # 12 hours
+    4: 39600,  # 11 hours
+    5: 36000,  # 10 hours
+    6: 32400,  #  9 hours
+    7: 28800,  #  8 hours
+    8: 25200,  #  7 hours
+    9: 21600,  #  6 hours
+    10: 18000,  #  5 hours
+    11: 14400,  #  4 hours
+    12: 10800,  #  3 hours
+    13: 7200,  #  2 hours
+    14: 3600,  #  1 hour
+    15: 3000,  # 50 minutes
+    16: 2400,  # 40 minutes
+    17: 1800,  # 30 minutes
+    18: 1200,  # 20 minutes
+    19: 600,  # 10 minutes
+    20: 420,  #  7 minutes
+    21: 300,  #  5 minutes
+    22: 240,  #  4 minutes
+    23: 180,  #  3 minutes
+    24: 120,  #  2 minutes
+    25: 60,  #  1 minute
+    26: 60,  #  1 minute (Just in case)
+}
+
+# Reaching this level recreates the universe
+FINAL_LEVEL = 26
+# The highest level the store sells
+HIGHEST_FOR_SALE = 22
+
+
+def animal_limit(multiplier: float) -> int:
+    """Return how many animals of a level a player with ``multiplier`` may have"""
+    return 6 + math.ceil((multiplier - 1) * 5)
+
+
+def get_total_price(level, bought, amount, bt=True):
+    # Every animal bought costs 300 more than the one before it, so the total is the sum of
+    # an arithmetic series
+    if amount <= 0:
+        return 0
+    first = level * 800 + ((2**level) * 10) - 200
+    if not bt:
+        return first * amount
+    first += bought * 300
+    return first * amount + 150 * amount * (amount - 1)
+
+
+def get_max_affordable(level, bought, balance, limit, bt=True):
+    """Return how many animals of ``level`` can be bought with ``balance``, up to ``limit``"""
+    balance = int(balance)
+    if level < 1 or limit <= 0 or balance <= 0:
+        return 0
+    first = level * 800 + ((2**level) * 10) - 200
+    if not bt:
+        return min(balance // first, limit)
+    first += bought * 300
+    # Solve 150n^2 + (first - 150)n <= balance for the largest whole n
+    b = first - 150
+    amount = (math.isqrt(b * b + 600 * balance) - b) // 300
+    while amount > 0 and get_total_price(level, bought, amount) > balance:
+        amount -= 1
+    while get_total_price(level, bought, amount + 1) <= balance:
+        amount += 1
+    return max(min(amount, limit), 0)
+
+
+def roll_evolution(level):
+    """Roll whether evolving animals of ``level`` works.
+
+    Returns ``"success"``, or if it fails ``"recovered"`` when the animals are kept and
+    ``"lost"`` when they are not."""
+    if level < 11:
+        number = random.randint(1, 100)
+    elif level < 21:
+        number = random.randint(1, 1000)
+    else:
+        number = random.randint(1, 10000)
+    if number != 1:
+        return "success"
+    return "recovered" if random.randint(1, 10) == 1 else "lost"
+
+
+def evolve_refusal(
+    level: int, amount: int, current: int, following: int, limit: int
+) -> Optional[str]:
+    """Return why ``amount`` pairs of ``current`` animals of ``level`` cannot be evolved, when
+    there are ``following`` of the next level, or None if they can"""
+    if level < 1 or amount < 1:
+        return "Too low!"
+    if amount > limit // 2:
+        return "Too high!"
+    if current < amount * 2:
+        return "You don't have enough animals at that level."
+    if following + amount > limit:
+        return f"You'd have too many Level {level + 1}s!  Evolve some of them instead!"
+    return None
+
+
+def buy_level_refusal(level: int, highest: int) -> Optional[str]:
+    """Return why animals of ``level`` cannot be bought by a player who reached ``highest``"""
+    if level < 1:
+        return "Ya cant buy a negative level!"
+    if level > HIGHEST_FOR_SALE:
+        return f"The highest level you can buy is level {HIGHEST_FOR_SALE}."
+    if level > highest - 3 and level > 1:
+        return "Please get higher animals to buy higher levels of them."
+    return None
+
+
+def buy_amount_refusal(amount: int, owned: int, limit: int) -> Optional[str]:
+    """Return why ``amount`` more animals cannot be bought when ``owned`` are had already"""
+    if owned >= limit:
+        return "You have too many of those!  Evolve some of them already."
+    if owned + amount > limit:
+        return "You'd have too many of those!  Evolve some of them already."
+    if amount < 1:
+        return "Ya cant buy a negative amount!"
+    return None
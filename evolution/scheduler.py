@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import heapq
+from typing import Dict, List, Tuple
+
+
+class LevelScheduler:
+    """Keeps every level under the time it next pays out income, in a heap.
+
+    Levels pay out once their delay has passed since they were last credited, so only the
+    earliest deadline has to be looked at to know how long to sleep, and a tick only touches
+    the levels that are actually due."""
+
+    def __init__(self, delays: Dict[int, int], lastcredited: Dict[str, float]):
+        self.delays = delays
+        self._heap: List[Tuple[float, int]] = [
+            (lastcredited.get(str(level), 0) + delay, level) for level, delay in delays.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_deadline(self) -> float:
+        return self._heap[0][0]
+
+    def pop_due(self, now: float) -> List[int]:
+        """Remove and return every level whose deadline is not after ``now``"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def reschedule(self, levels: List[int], now: float) -> None:
+        """File ``levels`` under their next deadline, after being credited at ``now``"""
+        for level in levels:
+            heapq.heappush(self._heap, (now + self.delays[level], level))
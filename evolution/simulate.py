@@ -0,0 +1,220 @@
+"""Offline simulator for the Evolution economy.
+
+Synthetic players earn income through the same sampler as the income task.  They evolve and
+buy animals under the same rules and prices as the commands, and their state is changed by the
+same `Player.evolve` and `Player.buy` that the commands go through, over simulated time.  Nothing
+connects to Discord or touches Config, so Red does not have to be installed.  Run it from the
+folder containing the cog with::
+
+    python -m evolution.simulate [--players 1000] [--days 30] [--sizes 1000,10000,100000]
+
+The economy run reports the credits minted per hour and how long players take to reach a Level
+26 animal.  The scaling run reports the latency of an income tick in which every level is due,
+and the peak memory of the players and the tick, for each population size.  The default sizes
+stop at 100,000 players to keep the run short; pass ``--sizes 1000,10000,100000,1000000`` for a
+million players, which takes minutes without NumPy and over a GiB of memory.  Use it to check
+retuned levels, delays or prices before shipping them."""
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from . import rules
+from .income import IncomeTable
+from .scheduler import LevelScheduler
+from .state import LEVELS, Player
+
+ANIMAL = "chicken"
+
+
+class Economy:
+    """A population of players, all following the same greedy strategy.
+
+    Every ``decide`` seconds each player evolves whatever they can, highest level first, and
+    then spends their balance on the highest level of animal they are allowed to buy."""
+
+    def __init__(self, players: int, balance: int = 10000):
+        self.income = IncomeTable(rules.INCOME)
+        self.players: Dict[int, Player] = {
+            user_id: Player(animal=ANIMAL, animals={"1": 1}) for user_id in range(players)
+        }
+        self.balances: List[int] = [balance] * players
+        self.universe_started: List[float] = [0.0] * players
+        self.minted = 0
+        self.spent = 0
+        self.reached: List[float] = []
+        self.ticks: List[float] = []
+
+    async def tick(self, levels: List[int]) -> None:
+        start = time.perf_counter()
+        gains = await self.income.gains(self.players, levels)
+        self.ticks.append(time.perf_counter() - start)
+        for user_id, gain in gains.items():
+            if gain:
+                credited = int(gain * self.players[user_id].multiplier)
+                self.balances[user_id] += credited
+                self.minted += credited
+
+    def evolve(self, user_id: int, now: float) -> None:
+        player = self.players[user_id]
+        limit = rules.animal_limit(player.multiplier)
+        for level in range(LEVELS - 1, 0, -1):
+            current, following = player.animals[level - 1], player.animals[level]
+            amount = min(current // 2, limit // 2, limit - following)
+            if rules.evolve_refusal(level, amount, current, following, limit):
+                continue
+            if player.evolve(level, amount, rules.roll_evolution(level)):
+                self.balances[user_id] = 0
+                self.reached.append(now - self.universe_started[user_id])
+                self.universe_started[user_id] = now
+                return
+
+    def buy(self, user_id: int) -> None:
+        player = self.players[user_id]
+        limit = rules.animal_limit(player.multiplier)
+        balance = self.balances[user_id]
+        for level in range(rules.HIGHEST_FOR_SALE, 0, -1):
+            if rules.buy_level_refusal(level, player.highest):
+                continue
+            owned = player.animals[level - 1]
+            bought = player.bought[level - 1]
+            amount = rules.get_max_affordable(level, bought, balance, limit - owned)
+            price = rules.get_total_price(level, bought, amount)
+            if price <= balance and not rules.buy_amount_refusal(amount, owned, limit):
+                self.balances[user_id] -= price
+                self.spent += price
+                player.buy(level, amount)
+                return
+
+    async def run(self, seconds: float, decide: float) -> None:
+        scheduler = LevelScheduler(
+            {level: rules.DELAYS[level] for level in self.income.payouts}, {}
+        )
+        decision = decide
+        while True:
+            now = min(scheduler.next_deadline(), decision)
+            if now > seconds:
+                break
+            due = scheduler.pop_due(now)
+            if due:
+                await self.tick(due)
+                scheduler.reschedule(due, now)
+            if decision <= now:
+                for user_id in self.players:
+                    self.evolve(user_id, now)
+                    self.buy(user_id)
+                decision += decide
+
+
+def synthetic_players(count: int, rng: random.Random) -> Dict[int, Player]:
+    players = {}
+    for user_id in range(count):
+        highest = rng.randint(1, 25)
+        animals = {str(level): rng.randint(0, 6) for level in range(1, highest + 1)}
+        players[user_id] = Player(animal=ANIMAL, animals=animals)
+    return players
+
+
+async def measure_tick(count: int, repeat: int, seed: Optional[int]):
+    """Return the best latency of a tick with every level due, and the peak memory in bytes"""
+    tracemalloc.start()
+    players = synthetic_players(count, random.Random(seed))
+    income = IncomeTable(rules.INCOME)
+    levels = list(income.payouts)
+    await income.gains(players, levels)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await income.gains(players, levels)
+        best = min(best, time.perf_counter() - start)
+    return best, peak
+
+
+def _duration(seconds: float) -> str:
+    return f"{seconds / 86400:,.1f} days"
+
+
+async def simulate(args) -> None:
+    if args.players:
+        economy = Economy(args.players, args.balance)
+        seconds = args.days * 86400
+        start = time.perf_counter()
+        await economy.run(seconds, args.decide * 3600)
+        elapsed = time.perf_counter() - start
+        hours = seconds / 3600
+        per_player = economy.minted / hours / args.players
+        highest = [player.highest for player in economy.players.values()]
+
+        print(f"[Economy] {args.players:,} players over {args.days:,} days ({elapsed:.1f}s)")
+        print(f"Credits minted per hour:            {economy.minted / hours:>16,.0f}")
+        print(f"Credits minted per player per hour: {per_player:>16,.1f}")
+        print(f"Credits spent in the store:         {economy.spent:>16,}")
+        print(f"Credits still held:                 {sum(economy.balances):>16,}")
+        print(f"Median highest level:               {statistics.median(highest):>16}")
+        if economy.reached:
+            print(f"Reached Level 26:                   {len(economy.reached):>16,} times")
+            print(f"Fastest time to Level 26:           {_duration(min(economy.reached)):>16}")
+            median = statistics.median(economy.reached)
+            print(f"Median time to Level 26:            {_duration(median):>16}")
+        else:
+            print(f"Reached Level 26:                   {'never':>16}")
+        if economy.ticks:
+            ticks = sorted(economy.ticks)
+            print(
+                f"Tick latency:  median {statistics.median(ticks) * 1000:.2f} ms, "
+                f"max {ticks[-1] * 1000:.2f} ms over {len(ticks):,} ticks"
+            )
+        print()
+
+    if args.sizes:
+        print(f"{'Players':>12}{'Tick (ms)':>14}{'Per player (us)':>18}{'Peak (MiB)':>14}")
+        for size in args.sizes:
+            latency, peak = await measure_tick(size, args.repeat, args.seed)
+            print(
+                f"{size:>12,}{latency * 1000:>14,.1f}{latency / size * 1e6:>18.2f}"
+                f"{peak / 1024 / 1024:>14,.1f}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m evolution.simulate", description="Simulate the Evolution economy."
+    )
+    parser.add_argument("--players", type=int, default=1000, help="players in the economy run")
+    parser.add_argument("--days", type=float, default=30, help="simulated days")
+    # Without any credits to start with, nobody can buy anything and the economy never moves.
+    # This is about what a player has after a few days of paydays, and fills a backyard with
+    # Level 1 animals.
+    parser.add_argument(
+        "--balance",
+        type=int,
+        default=10000,
+        help="credits each player starts with, e.g. from paydays",
+    )
+    parser.add_argument("--decide", type=float, default=1, help="hours between the players' moves")
+    parser.add_argument(
+        "--sizes",
+        type=lambda sizes: [int(size) for size in sizes.split(",") if size],
+        default=[1000, 10000, 100000],
+        help="comma separated population sizes for the scaling run, e.g. add 1000000",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timed ticks per population size")
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    asyncio.run(simulate(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
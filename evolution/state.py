@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+from array import array
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Set
+
+from . import rules
+
+if TYPE_CHECKING:
+    from redbot.core import Config
+
+LEVELS = 26
+
+log = logging.getLogger("red.3pt.cog.toxic.evolution")
+
+
+class Player:
+    """The state of one player, stored compactly.
+
+    Animal counts are kept in fixed-length arrays indexed by level - 1, rather than in dicts
+    keyed by strings.  Updates replace the arrays instead of changing them, so a reference to
+    them is a consistent snapshot that never has to be copied."""
+
+    __slots__ = ("animal", "animals", "bought", "highest", "multiplier", "stash")
+
+    def __init__(
+        self,
+        animal: str = "",
+        animals: Mapping = None,
+        bought: Mapping = None,
+        multiplier: float = 1.0,
+        stash: dict = None,
+    ):
+        self.animal = animal
+        self.animals, self.highest = self._counts(animals or {})
+        self.bought, _ = self._counts(bought or {})
+        self.multiplier = float(multiplier)
+        self.stash = self._stash(stash)
+
+    @staticmethod
+    def _counts(mapping: Mapping):
+        counts = array("I", [0]) * LEVELS
+        highest = 0
+        for level, count in mapping.items():
+            level = int(level)
+            if 1 <= level <= LEVELS:
+                counts[level - 1] = int(count)
+                highest = max(highest, level)
+        return counts, highest
+
+    @staticmethod
+    def _mapping(counts: array, highest: int = 0) -> Dict[str, int]:
+        # The highest level that was reached is kept even when it is empty, as it decides which
+        # animals can be bought
+        return {
+            str(level): count for level, count in enumerate(counts, 1) if count or level == highest
+        }
+
+    @staticmethod
+    def _stash(stash: Optional[dict]) -> Optional[dict]:
+        # Most players never have anything stashed, so an empty stash is not stored at all
+        if not stash or not any(stash.values()):
+            return None
+        return copy.deepcopy(stash)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> Player:
+        fields = ("animal", "animals", "bought", "multiplier", "stash")
+        return cls(**{key: data[key] for key in fields if key in data})
+
+    def update(self, values: Mapping) -> None:
+        for key, value in values.items():
+            if key == "animals":
+                self.animals, self.highest = self._counts(value)
+            elif key == "bought":
+                self.bought, _ = self._counts(value)
+            elif key == "multiplier":
+                self.multiplier = float(value)
+            elif key == "stash":
+                self.stash = self._stash(value)
+            elif key == "animal":
+                self.animal = value
+            else:
+                raise KeyError(key)
+
+    def evolve(self, level: int, amount: int, result: str) -> bool:
+        """Apply the ``result`` of `rules.roll_evolution` to evolving ``amount`` pairs of
+        animals of ``level``.
+
+        Returns whether a Level 26 animal was reached.  The universe is then recreated, which
+        resets the backyard and raises the multiplier, and the caller has to reset the balance.
+        """
+        if result == "recovered":
+            return False
+        if result == "success" and level + 1 == rules.FINAL_LEVEL:
+            self.update({"animals": {"1": 1}, "multiplier": self.multiplier + 0.2})
+            return True
+        animals = array("I", self.animals)
+        animals[level - 1] -= 2 * amount
+        if result == "success":
+            animals[level] += amount
+            self.highest = max(self.highest, level + 1)
+        self.animals = animals
+        return False
+
+    def buy(self, level: int, amount: int) -> None:
+        """Add ``amount`` animals of ``level`` bought from the store"""
+        animals, bought = array("I", self.animals), array("I", self.bought)
+        animals[level - 1] += amount
+        bought[level - 1] += 1
+        self.animals, self.bought = animals, bought
+
+    def to_dict(self) -> dict:
+        return {
+            "animal": self.animal,
+            "animals": self._mapping(self.animals, self.highest),
+            "bought": self._mapping(self.bought),
+            "multiplier": self.multiplier,
+            "stash": copy.deepcopy(self.stash) or {"animals": {}, "perks": {}},
+        }
+
+
+class PlayerStore:
+    """The state of every player, kept in memory as the only source of truth.
+
+    Commands read a copy of a player's state with `get`, and change it with `update`, which
+    takes effect in memory at once and bumps the player's version.  Changed players are written
+    to Config in the background by `run`, so a command never waits on a config read or write.
+    Versions also let a command that waited on a reaction check that nothing changed meanwhile.
+    """
+
+    def __init__(self, conf: Config, delay: float = 1.0):
+        self.conf = conf
+        self.delay = delay
+        self._players: Dict[int, Player] = {}
+        self._versions: Dict[int, int] = {}
+        self._dirty: Set[int] = set()
+        self._changed = asyncio.Event()
+        # Set once the saved state is in memory, which nothing should read or change before
+        self.loaded = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._players
+
+    async def load(self) -> None:
+        for user_id, data in (await self.conf.all_users()).items():
+            self._players[int(user_id)] = Player.from_dict(data)
+        self.loaded.set()
+
+    def get(self, user_id: int) -> dict:
+        """Return a copy of the state of ``user_id``, which can be changed freely"""
+        player = self._players.get(user_id)
+        return (Player() if player is None else player).to_dict()
+
+    def version(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def _player(self, user_id: int) -> Player:
+        player = self._players.get(user_id)
+        if player is None:
+            player = self._players[user_id] = Player()
+        return player
+
+    def _touch(self, user_id: int) -> int:
+        self._versions[user_id] = self.version(user_id) + 1
+        self._dirty.add(user_id)
+        self._changed.set()
+        return self._versions[user_id]
+
+    def update(self, user_id: int, **values) -> int:
+        """Replace values of the state of ``user_id``, returning its new version"""
+        self._player(user_id).update(values)
+        return self._touch(user_id)
+
+    def evolve(self, user_id: int, level: int, amount: int, result: str) -> bool:
+        """Apply an evolution to ``user_id`` with `Player.evolve`, returning whether the
+        universe was recreated"""
+        recreated = self._player(user_id).evolve(level, amount, result)
+        self._touch(user_id)
+        return recreated
+
+    def buy(self, user_id: int, level: int, amount: int) -> int:
+        """Apply a store purchase to ``user_id`` with `Player.buy`, returning its new version"""
+        self._player(user_id).buy(level, amount)
+        return self._touch(user_id)
+
+    async def delete(self, user_id: int) -> None:
+        self._players.pop(user_id, None)
+        self._versions[user_id] = self.version(user_id) + 1
+        self._dirty.discard(user_id)
+        await self.conf.user_from_id(user_id).clear()
+
+    def playing(self) -> Dict[int, Player]:
+        """Return every player who has picked an animal.
+
+        The players are not copied.  Their animal counts can be read across awaits, as updates
+        replace the arrays rather than changing them."""
+        return {user_id: player for user_id, player in self._players.items() if player.animal}
+
+    async def flush(self) -> int:
+        """Write every changed player to Config, returning how many were written"""
+        dirty, self._dirty = self._dirty, set()
+        written = 0
+        try:
+            for user_id in dirty:
+                player = self._players.get(user_id)
+                if player is not None:
+                    await self.conf.user_from_id(user_id).set(player.to_dict())
+                written += 1
+        finally:
+            # Anything that could not be written is tried again on the next flush
+            self._dirty.update(list(dirty)[written:])
+        return written
+
+    async def run(self, max_backoff: float = 300) -> None:
+        """Write changes in the background, batching those made within ``delay`` seconds.
+
+        A failed flush keeps the players it could not write, and is tried again after a delay
+        that doubles with every failure in a row, up to ``max_backoff`` seconds."""
+        backoff = self.delay
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.delay)
+            self._changed.clear()
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Failed to save the Evolution players, retrying in %ss", backoff)
+                self._changed.set()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+            else:
+                backoff = self.delay
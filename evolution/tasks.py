@@ -1,19 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-import contextlib
 import random
 import time
 from typing import TYPE_CHECKING, Dict
 
 from redbot.core import Config
 from redbot.core.bot import Red
-from redbot.core.utils import AsyncIter
 
 if TYPE_CHECKING:
     from .evolution import Evolution
 
 from . import bank
+from .income import IncomeTable
+from .metrics import TaskMetrics
+from .scheduler import LevelScheduler
 
 
 class EvolutionTaskManager:
@@ -23,95 +24,150 @@ class EvolutionTaskManager:
         self.cog: Evolution = cog
 
         self.tasks: Dict[str, asyncio.Task] = {}
-
-    async def process_credits(self, data, ct, timedata):
-        all_gaining = 0
-        async for key, value in AsyncIter(data.items()):
-            last_processed = timedata[str(key)]
-            if ct > last_processed + self.cog.utils.delays[int(key)]:
-                for x in range(0, value):
-                    chance = random.randint(1, 100)
-                    chances = list(self.cog.utils.levels[int(key)].keys())
-                    chosen = min([c for c in chances if chance <= c])
-                    gaining = self.cog.utils.levels[int(key)][chosen]
-                    all_gaining += gaining
-        return all_gaining
-
-    async def process_times(self, ct, timedata):
-        async for key in AsyncIter(range(1, 26)):
-            last_processed = timedata[str(key)]
-            if ct > last_processed + self.cog.utils.delays[int(key)]:
-                timedata[str(key)] = ct
-        return timedata
+        self.metrics: Dict[str, TaskMetrics] = {
+            "income": TaskMetrics(),
+            "daily": TaskMetrics(),
+            "ledger": TaskMetrics(),
+        }
+        self.income = IncomeTable(self.cog.utils.levels)
+        self.deals: Dict[str, dict] = {}
+        self.deals_loaded = asyncio.Event()
+        self.ledger = bank.BalanceLedger()
+
+    async def process_credits(self, players, levels):
+        """Work out how much each player gains from ``levels``, before their multiplier"""
+        return await self.income.gains(players, levels)
 
     async def income_task(self):
         await self.bot.wait_until_ready()
+        await self.cog.players.loaded.wait()
+        lastcredited = await self.cog.conf.lastcredited()
+        delays = self.cog.utils.delays
+        scheduler = LevelScheduler(
+            {level: delays[level] for level in self.income.payouts}, lastcredited
+        )
         while True:
-            # First, process the credits being added
-            bulk_edit = {}
+            # Sleep until the next level is due, rather than checking every level each minute
+            deadline = scheduler.next_deadline()
+            await asyncio.sleep(max(deadline - time.time(), 0))
             ct = time.time()
-            lastcredited = await self.cog.conf.lastcredited()
-            async for userid, data in AsyncIter(self.cog.cache.copy().items()):
-                animal = data["animal"]
-                if animal == "":
-                    continue
-                multiplier = data["multiplier"]
-                animals = data["animals"]
-                gaining = await self.process_credits(animals, ct, lastcredited) * multiplier
-                bulk_edit[str(userid)] = gaining
-
-            # Credit to aikaterna's seen cog for this bulk write
-            config = bank._get_config()
-            users = config._get_base_group(config.USER)
-            max_credits = await bank.get_max_balance()
-            async with users.all() as new_data:
-                for user_id, userdata in bulk_edit.items():
-                    if str(user_id) not in new_data:
-                        new_data[str(user_id)] = {"balance": userdata}
-                        continue
-                    if new_data[str(user_id)]["balance"] + userdata > max_credits:
-                        new_data[str(user_id)]["balance"] = int(max_credits)
-                    else:
-                        new_data[str(user_id)]["balance"] = int(
-                            new_data[str(user_id)]["balance"] + userdata
-                        )
-
-            await self.cog.conf.lastcredited.set(await self.process_times(ct, lastcredited))
-            await asyncio.sleep(60)
+            started = time.perf_counter()
+            due = scheduler.pop_due(ct)
+            if not due:
+                continue
+
+            # First, process the credits being added.  They are written by the ledger task.
+            playing = self.cog.players.playing()
+            gains = await self.process_credits(playing, due)
+            minted = 0
+            for userid, gaining in gains.items():
+                credited = int(gaining * playing[userid].multiplier)
+                self.ledger.credit(userid, credited)
+                minted += credited
+
+            for level in due:
+                lastcredited[str(level)] = ct
+            writing = time.perf_counter()
+            await self.cog.conf.lastcredited.set(lastcredited)
+            write = time.perf_counter() - writing
+            scheduler.reschedule(due, ct)
+            self.metrics["income"].record(
+                started, lag=ct - deadline, users=len(playing), minted=minted, write=write
+            )
+
+    async def ledger_task(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(await self.conf.ledgerinterval())
+            started = time.perf_counter()
+            written = await self.ledger.flush()
+            # Flushing is nothing but writing, so the whole run counts as write time
+            self.metrics["ledger"].record(
+                started, users=written, write=time.perf_counter() - started
+            )
+
+    async def get_deals(self) -> Dict[str, dict]:
+        """Return the current daily deals, where ``bought`` is a set of user IDs.
+
+        The dict is replaced when the deals rotate, so it can be compared by identity to tell
+        whether they changed."""
+        await self.deals_loaded.wait()
+        return self.deals
 
     async def daily_task(self):
         await self.bot.wait_until_ready()
+        deals = await self.cog.conf.daily()
+        for deal in deals.values():
+            deal["bought"] = set(deal["bought"])
+        self.deals = deals
+        self.deals_loaded.set()
+        lastdailyupdate = await self.cog.conf.lastdailyupdate()
         while True:
-            lastdailyupdate = await self.cog.conf.lastdailyupdate()
-            if lastdailyupdate + 86400 <= time.time():
-                deals = {}
-                levels = random.sample(
-                    self.cog.utils.randlvl_chances, len(self.cog.utils.randlvl_chances)
-                )
-                amounts = random.sample(
-                    self.cog.utils.randamt_chances, len(self.cog.utils.randamt_chances)
+            # Sleep until the deals are due to rotate, instead of checking every few minutes
+            deadline = lastdailyupdate + 86400
+            await asyncio.sleep(max(deadline - time.time(), 0))
+            started = time.perf_counter()
+            deals = {}
+            levels = random.sample(
+                self.cog.utils.randlvl_chances, len(self.cog.utils.randlvl_chances)
+            )
+            amounts = random.sample(
+                self.cog.utils.randamt_chances, len(self.cog.utils.randamt_chances)
+            )
+            for x in range(1, 7):
+                level = random.choice(levels)
+                amount = random.choice(amounts)
+                deals[str(x)] = {"details": {"level": level, "amount": amount}, "bought": set()}
+            lastdailyupdate = time.time()
+            writing = time.perf_counter()
+            async with self.cog.locks("daily"):
+                self.deals = deals
+                await self.cog.conf.daily.set(
+                    {did: {**deal, "bought": []} for did, deal in deals.items()}
                 )
-                for x in range(1, 7):
-                    level = random.choice(levels)
-                    amount = random.choice(amounts)
-                    deals[str(x)] = {"details": {"level": level, "amount": amount}, "bought": []}
-                await self.cog.conf.daily.set(deals)
-                await self.cog.conf.lastdailyupdate.set(time.time())
-            await asyncio.sleep(300)
+            await self.cog.conf.lastdailyupdate.set(lastdailyupdate)
+            self.metrics["daily"].record(
+                started, lag=lastdailyupdate - deadline, write=time.perf_counter() - writing
+            )
 
     def get_statuses(self):
         returning = {}
         for task, obj in self.tasks.items():
             exc = None
-            with contextlib.suppress(asyncio.exceptions.InvalidStateError):
+            if obj.done() and not obj.cancelled():
                 exc = obj.exception()
-            returning[task] = {"state": obj._state, "exc": exc}
+            if obj.cancelled():
+                state = "cancelled"
+            elif obj.done():
+                state = "finished"
+            else:
+                state = "running"
+            returning[task] = {"state": state, "exc": exc}
+        return returning
+
+    def get_metrics(self):
+        """Return the status and metrics of every task as plain data, for dashboards"""
+        statuses = self.get_statuses()
+        returning = {}
+        for task, status in statuses.items():
+            exc = status["exc"]
+            returning[task] = {
+                "state": status["state"],
+                "error": None if exc is None else f"{type(exc).__name__}: {exc}",
+                **(self.metrics[task].snapshot() if task in self.metrics else {}),
+            }
+        returning["ledger"]["pending"] = len(self.ledger)
         return returning
 
     def init_tasks(self):
         self.tasks["income"] = self.bot.loop.create_task(self.income_task())
         self.tasks["daily"] = self.bot.loop.create_task(self.daily_task())
+        self.tasks["ledger"] = self.bot.loop.create_task(self.ledger_task())
+        self.tasks["players"] = self.bot.loop.create_task(self.cog.players.run())
 
-    def shutdown(self):
+    async def shutdown(self):
         for task in self.tasks.values():
             task.cancel()
+        # Write whatever income and player changes are still waiting
+        await self.ledger.flush()
+        await self.cog.players.flush()
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 import traceback
-from typing import TYPE_CHECKING
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, Tuple
 
 from redbot.core import Config
 from redbot.core.bot import Red
-from redbot.core.utils.menus import menu
+from redbot.core.utils.chat_formatting import humanize_timedelta
 
 if TYPE_CHECKING:
     from .evolution import Evolution
 
+from . import rules
+
 
 class EvolutionUtils:
     def __init__(self, cog):
@@ -17,81 +20,19 @@ class EvolutionUtils:
         self.conf: Config = cog.conf
         self.cog: Evolution = cog
 
-    @staticmethod
-    def get_total_price(level, bought, amount, bt=True):
-        total = 0
-        for x in range(amount):
-            normal = level * 800
-            level_tax = ((2**level) * 10) - 200
-            if bt:
-                tax = bought * 300
-                extra = x * 300
-            else:
-                tax = 0
-                extra = 0
-            total += normal + level_tax + tax + extra
-        return total
+        self.level_info: Dict[int, Tuple[str, str]] = self.build_level_info()
+
+    get_total_price = staticmethod(rules.get_total_price)
+    get_max_affordable = staticmethod(rules.get_max_affordable)
+    roll_evolution = staticmethod(rules.roll_evolution)
 
     @property
     def levels(self):
-        return {
-            1: {100: 10},
-            2: {90: 10, 100: 100},
-            3: {80: 10, 100: 100},
-            4: {70: 10, 100: 100},
-            5: {60: 10, 100: 100},
-            6: {50: 10, 90: 100, 100: 1000},
-            7: {40: 10, 80: 100, 100: 1000},
-            8: {30: 10, 70: 100, 100: 1000},
-            9: {20: 10, 60: 100, 100: 1000},
-            10: {10: 10, 50: 100, 100: 1000},
-            11: {40: 100, 90: 1000, 100: 1500},
-            12: {30: 100, 80: 1000, 100: 1500},
-            13: {20: 100, 70: 1000, 100: 1500},
-            14: {10: 100, 60: 1000, 100: 1500},
-            15: {50: 1000, 100: 1500},
-            16: {40: 1000, 100: 1500},
-            17: {30: 1000, 100: 1500},
-            18: {20: 1000, 100: 1500},
-            19: {10: 1000, 100: 1500},
-            20: {90: 1500, 100: 2000},
-            21: {80: 1500, 100: 2000},
-            22: {70: 1500, 100: 2000},
-            23: {60: 1500, 100: 2000},
-            24: {50: 1500, 100: 2000},
-            25: {100: 2000},
-        }
+        return rules.INCOME
 
     @property
     def delays(self):
-        return {
-            1: 86400,  # 24 hours
-            2: 64800,  # 18 hours
-            3: 43200,  # 12 hours
-            4: 39600,  # 11 hours
-            5: 36000,  # 10 hours
-            6: 32400,  #  9 hours
-            7: 28800,  #  8 hours
-            8: 25200,  #  7 hours
-            9: 21600,  #  6 hours
-            10: 18000,  #  5 hours
-            11: 14400,  #  4 hours
-            12: 10800,  #  3 hours
-            13: 7200,  #  2 hours
-            14: 3600,  #  1 hour
-            15: 3000,  # 50 minutes
-            16: 2400,  # 40 minutes
-            17: 1800,  # 30 minutes
-            18: 1200,  # 20 minutes
-            19: 600,  # 10 minutes
-            20: 420,  #  7 minutes
-            21: 300,  #  5 minutes
-            22: 240,  #  4 minutes
-            23: 180,  #  3 minutes
-            24: 120,  #  2 minutes
-            25: 60,  #  1 minute
-            26: 60,  #  1 minute (Just in case)
-        }
+        return rules.DELAYS
 
     @property
     def randlvl_chances(self):
@@ -165,11 +106,21 @@ class EvolutionUtils:
     def randamt_chances(self):
         return [1, 1, 2, 2, 2, 3, 3, 3, 4, 5]
 
-    async def shop_control_callback(self, ctx, pages, controls, message, page, timeout, emoji):
-        description = message.embeds[0].description
-        level = int(description.split(" ")[1])
-        self.bot.loop.create_task(ctx.invoke(self.cog.store, level=level))
-        return await menu(ctx, pages, controls, message=message, page=page, timeout=timeout)
+    def build_level_info(self):
+        """Build the income and credit delay text of every level, for the store pages"""
+        info = {}
+        levels, delays = self.levels, self.delays
+        for level, delay in delays.items():
+            last = 0
+            chances = []
+            for chance, value in levels.get(level, {100: 1000}).items():
+                chances.append(f"{str(chance-last)}% chance to gain {str(value)}")
+                last = chance
+            info[level] = (
+                "\n".join(chances),
+                humanize_timedelta(timedelta=timedelta(seconds=delay)),
+            )
+        return info
 
     def format_task(self, task):
         state = task["state"].lower()
@@ -183,20 +134,62 @@ class EvolutionUtils:
             exc_output = "No error has been encountered."
         return f"Task is currently {state}.  {exc_output}"
 
-    def init_config(self):
-        default_user = {
+    @staticmethod
+    def format_metrics(metrics):
+        def ms(seconds):
+            return f"{seconds * 1000:,.1f}ms"
+
+        lines = []
+        for name, task in metrics.items():
+            lines.append(f"[{name.title()}] {task['state']}")
+            if task["error"]:
+                lines.append(f"Error: {task['error']}")
+            if "runs" not in task:
+                continue
+            lines.append(
+                f"Runs: {task['runs']:,}  Users: {task['users']:,}  Minted: {task['minted']:,.0f}"
+            )
+            if "pending" in task:
+                lines.append(f"Pending accounts: {task['pending']:,}")
+            last = task["last"]
+            if last:
+                lines.append(
+                    f"Last: took {ms(last['duration'])}, {last['lag']:,.1f}s late, "
+                    f"{last['users']:,} users, {last['minted']:,.0f} minted, "
+                    f"{ms(last['write'])} writing"
+                )
+            latency = task["latency"]
+            if latency:
+                lines.append(
+                    f"Latency: mean {ms(latency['mean'])}, p50 {ms(latency['p50'])}, "
+                    f"p95 {ms(latency['p95'])}, max {ms(latency['max'])}"
+                )
+                histogram = "  ".join(
+                    f"{bucket} {count}" for bucket, count in task["histogram"].items() if count
+                )
+                lines.append(f"Histogram: {histogram}")
+            lines.append("")
+        return "\n".join(lines)
+
+    @property
+    def default_user(self):
+        return {
             "animal": "",
             "animals": {},
             "multiplier": 1.0,
             "bought": {},
             "stash": {"animals": {}, "perks": {}},
         }
+
+    def init_config(self):
+        default_user = self.default_user
         default_guild = {"cartchannel": 0, "last": 0}
         default_global = {
             "travelercooldown": "2h",
             "lastcredited": {},
             "lastdailyupdate": 0,
             "daily": {},
+            "ledgerinterval": 60,
         }
         for x in range(1, 27):
             default_global["lastcredited"][str(x)] = 0
@@ -206,6 +199,4 @@ class EvolutionUtils:
         self.conf.register_global(**default_global)
 
     async def initialize(self):
-        config = await self.cog.conf.all_users()
-        for k, v in config.items():
-            self.cog.cache[k] = v
+        await self.cog.players.load()
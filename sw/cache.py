@@ -0,0 +1,136 @@
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+API = "https://swapi.dev/api/"
+RESOURCES = ("people", "planets", "films", "starships", "vehicles", "species")
+
+
+class ResponseCache:
+    """Responses of the Star Wars API, kept in memory and in an SQLite file, keyed by URL.
+
+    The data almost never changes, so a response is used as is for ``ttl`` seconds.  After that
+    it is revalidated with its ETag, which costs a request but no download when nothing changed.
+    If the API cannot be reached, a stale response is used rather than failing the command."""
+
+    def __init__(self, session: aiohttp.ClientSession, path: str, ttl: float = 7 * 86400):
+        self.session = session
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[Optional[str], float, dict]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        # SQLite connections belong to one thread, so every query goes through this one
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="swapi-cache")
+        self._db: Optional[sqlite3.Connection] = None
+        # Once set, responses are only kept in memory, as the executor is going away
+        self._closing = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(url: str) -> str:
+        # Links in responses end with a slash, the URLs built by the commands do not
+        return url.rstrip("/")
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _open(self) -> list:
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(url TEXT PRIMARY KEY, etag TEXT, fetched REAL NOT NULL, body TEXT NOT NULL)"
+        )
+        return self._db.execute("SELECT url, etag, fetched, body FROM responses").fetchall()
+
+    def _store(self, url: str, etag: Optional[str], fetched: float, body: str) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (url, etag, fetched, body)
+            )
+
+    def _close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def load(self) -> None:
+        """Read the saved responses into memory"""
+        for url, etag, fetched, body in await self._run(self._open):
+            try:
+                self._entries[url] = (etag, fetched, json.loads(body))
+            except ValueError:
+                continue
+
+    async def close(self) -> None:
+        self._closing = True
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def _put(self, key: str, etag: Optional[str], data: dict) -> None:
+        fetched = time.time()
+        self._entries[key] = (etag, fetched, data)
+        if self._db is not None and not self._closing:
+            self._executor.submit(self._store, key, etag, fetched, json.dumps(data))
+
+    async def get(self, url: str) -> Optional[dict]:
+        """Return the response for ``url``, or None if the API does not know it"""
+        key = self.key(url)
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        # Commands often link to the same resources, so concurrent requests for one are shared
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._fetch(url, entry))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, url: str, entry: Optional[tuple]) -> Optional[dict]:
+        key = self.key(url)
+        headers = {}
+        if entry is not None and entry[0]:
+            headers["If-None-Match"] = entry[0]
+        try:
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 304 and entry is not None:
+                    self._put(key, entry[0], entry[2])
+                    return entry[2]
+                if response.status == 404:
+                    return None
+                response.raise_for_status()
+                data = json.loads(await response.text())
+                etag = response.headers.get("ETag")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            if entry is None:
+                raise
+            return entry[2]
+        self._put(key, etag, data)
+        # Listings and searches contain whole resources, which are cached under their own URL
+        if isinstance(data.get("results"), list):
+            for result in data["results"]:
+                if isinstance(result, dict) and result.get("url"):
+                    self._put(self.key(result["url"]), None, result)
+        return data
+
+    async def warm(self) -> None:
+        """Fetch every listing page, which caches every resource the commands can link to"""
+        await self.load()
+        try:
+            for resource in RESOURCES:
+                url = API + resource
+                while url:
+                    data = await self.get(url)
+                    url = data.get("next") if data else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass  # The rest is fetched when a command asks for it
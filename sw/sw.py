@@ -22,14 +22,15 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-import json
 from typing import Union
 
 import aiohttp
 import discord
 from redbot.core import commands
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.menus import DEFAULT_CONTROLS, menu
 
+from .cache import ResponseCache
 from .image import (
     HUMANDESCRIPTION,
     IMAGES,
@@ -51,11 +52,15 @@ class SW(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.session = aiohttp.ClientSession()
+        self.cache = ResponseCache(self.session, str(cog_data_path(self) / "responses.sqlite3"))
+        self.task = self.bot.loop.create_task(self.cache.warm())
 
-    def cog_unload(self):
-        self.__unload()
+    async def cog_unload(self):
+        await self.__unload()
 
-    def __unload(self):
+    async def __unload(self):
+        self.task.cancel()
+        await self.cache.close()
         self.session.detach()
 
     async def red_delete_data_for_user(self, **kwargs):
@@ -73,12 +78,9 @@ class SW(commands.Cog):
         """Gets the profile of a person by their ID"""
         if isinstance(person_id, int):
             async with ctx.typing():
-                response = await self.session.get(
-                    r"https://swapi.dev/api/people/" + str(person_id)
-                )
-                if response.status == 404:
+                person = await self.cache.get(r"https://swapi.dev/api/people/" + str(person_id))
+                if person is None:
                     return await ctx.send("Invalid Person ID.")
-                person = json.loads(await response.text())
                 embed = discord.Embed(
                     title=f"Person: {person['name']}",
                     description=HUMANDESCRIPTION[person["name"]],
@@ -101,23 +103,20 @@ class SW(commands.Cog):
                     embed.add_field(name=key.replace("_", " ").title(), value=value.title())
                 embed.set_thumbnail(url=IMAGES[person["name"]])
                 homeworld_num = int(person["homeworld"].split(r"/")[-2])
-                homeworld = await self.session.get(person["homeworld"])
-                homeworld = json.loads(await homeworld.text())
+                homeworld = await self.cache.get(person["homeworld"])
                 embed.add_field(
                     name="Homeworld", value=f"Name: {homeworld['name']}; ID: {str(homeworld_num)}"
                 )
                 films = []
                 for film in person["films"]:
                     film_num = int(film.split(r"/")[-2])
-                    response = await self.session.get(film)
-                    film = json.loads(await response.text())
+                    film = await self.cache.get(film)
                     films.append(f"Title: {film['title']}; ID: {str(film_num)}")
                 if len(films) != 0:
                     embed.add_field(name="Films:", value="\n".join(films))
                 if person["species"]:
                     species_num = int(person["species"][0].split(r"/")[-2])
-                    species = await self.session.get(person["species"][0])
-                    species = json.loads(await species.text())
+                    species = await self.cache.get(person["species"][0])
                     embed.add_field(
                         name="Species", value=f"Name: {species['name']}; ID: {str(species_num)}"
                     )
@@ -126,28 +125,25 @@ class SW(commands.Cog):
                 vehicles = []
                 for vehicle in person["vehicles"]:
                     vehicle_num = int(vehicle.split(r"/")[-2])
-                    response = await self.session.get(vehicle)
-                    vehicle = json.loads(await response.text())
+                    vehicle = await self.cache.get(vehicle)
                     vehicles.append(f"Name: {vehicle['name']}; ID: {str(vehicle_num)}")
                 if len(vehicles) != 0:
                     embed.add_field(name="Vehicles:", value="\n".join(vehicles))
                 starships = []
                 for starship in person["starships"]:
                     starship_num = int(starship.split(r"/")[-2])
-                    response = await self.session.get(starship)
-                    starship = json.loads(await response.text())
+                    starship = await self.cache.get(starship)
                     starships.append(f"Name: {starship['name']}; ID: {str(starship_num)}")
                 if len(starships) != 0:
                     embed.add_field(name="Starships:", value="\n".join(starships))
                 await ctx.send(embed=embed)
         else:
             async with ctx.typing():
-                response = await self.session.get(
+                person = await self.cache.get(
                     r"https://swapi.dev/api/people/?search=" + str(person_id)
                 )
-                if response.status == 404:
+                if person is None:
                     return await ctx.send("Invalid Person ID.")
-                person = json.loads(await response.text())
                 name = person["results"][0]["name"]
                 embed = discord.Embed(
                     title=f"Person: {name}", description=HUMANDESCRIPTION[name], color=0x32CD32
@@ -168,23 +164,20 @@ class SW(commands.Cog):
                     embed.add_field(name=key.replace("_", " ").title(), value=value.title())
                 embed.set_thumbnail(url=IMAGES[name])
                 homeworld_num = int(person["results"][0]["homeworld"].split(r"/")[-2])
-                homeworld = await self.session.get(person["results"][0]["homeworld"])
-                homeworld = json.loads(await homeworld.text())
+                homeworld = await self.cache.get(person["results"][0]["homeworld"])
                 embed.add_field(
                     name="Homeworld", value=f"Name: {homeworld['name']}; ID: {str(homeworld_num)}"
                 )
                 films = []
                 for film in person["results"][0]["films"]:
                     film_num = int(film.split(r"/")[-2])
-                    response = await self.session.get(film)
-                    film = json.loads(await response.text())
+                    film = await self.cache.get(film)
                     films.append(f"Title: {film['title']}; ID: {str(film_num)}")
                 if len(films) != 0:
                     embed.add_field(name="Films:", value="\n".join(films))
                 if person["results"][0]["species"]:
                     species_num = int(person["results"][0]["species"][0].split(r"/")[-2])
-                    species = await self.session.get(person["species"][0])
-                    species = json.loads(await species.text())
+                    species = await self.cache.get(person["species"][0])
                     embed.add_field(
                         name="Species", value=f"Name: {species['name']}; ID: {str(species_num)}"
                     )
@@ -193,16 +186,14 @@ class SW(commands.Cog):
                 vehicles = []
                 for vehicle in person["results"][0]["vehicles"]:
                     vehicle_num = int(vehicle.split(r"/")[-2])
-                    response = await self.session.get(vehicle)
-                    vehicle = json.loads(await response.text())
+                    vehicle = await self.cache.get(vehicle)
                     vehicles.append(f"Name: {vehicle['name']}; ID: {str(vehicle_num)}")
                 if len(vehicles) != 0:
                     embed.add_field(name="Vehicles:", value="\n".join(vehicles))
                 starships = []
                 for starship in person["results"][0]["starships"]:
                     starship_num = int(starship.split(r"/")[-2])
-                    response = await self.session.get(starship)
-                    starship = json.loads(await response.text())
+                    starship = await self.cache.get(starship)
                     starships.append(f"Name: {starship['name']}; ID: {str(starship_num)}")
                 if len(starships) != 0:
                     embed.add_field(name="Starships:", value="\n".join(starships))
@@ -213,12 +204,9 @@ class SW(commands.Cog):
         """Gets the profile of a planet by their ID"""
         if isinstance(planet_id, int):
             async with ctx.typing():
-                response = await self.session.get(
-                    r"https://swapi.dev/api/planets/" + str(planet_id)
-                )
-                if response.status == 404:
+                planet = await self.cache.get(r"https://swapi.dev/api/planets/" + str(planet_id))
+                if planet is None:
                     return await ctx.send("Invalid Planet ID.")
-                planet = json.loads(await response.text())
                 embed = discord.Embed(
                     title=f"Planet: {planet['name']}",
                     description=PLANETDESCRIPTION[planet["name"]],
@@ -241,28 +229,25 @@ class SW(commands.Cog):
                 films = []
                 for film in planet["films"]:
                     film_num = int(film.split(r"/")[-2])
-                    response = await self.session.get(film)
-                    film = json.loads(await response.text())
+                    film = await self.cache.get(film)
                     films.append(f"Title: {film['title']}; ID: {str(film_num)}")
                 if len(films) != 0:
                     embed.add_field(name="Films:", value="\n".join(films))
                 residents = []
                 for resident in planet["residents"]:
                     resident_num = int(resident.split(r"/")[-2])
-                    response = await self.session.get(resident)
-                    resident = json.loads(await response.text())
+                    resident = await self.cache.get(resident)
                     residents.append(f"Name: {resident['name']}; ID: {str(resident_num)}")
                 if len(residents) != 0:
                     embed.add_field(name="Residents:", value="\n".join(residents))
                 await ctx.send(embed=embed)
         else:
             async with ctx.typing():
-                response = await self.session.get(
+                planet = await self.cache.get(
                     r"https://swapi.dev/api/planets/?search=" + str(planet_id)
                 )
-                if response.status == 404:
+                if planet is None:
                     return await ctx.send("Invalid Planet ID.")
-                planet = json.loads(await response.text())
                 name = planet["results"][0]["name"]
                 embed = discord.Embed(
                     title=f"Planet: {name}", description=PLANETDESCRIPTION[name], color=0x800080
@@ -283,16 +268,14 @@ class SW(commands.Cog):
                 films = []
                 for film in planet["results"][0]["films"]:
                     film_num = int(film.split(r"/")[-2])
-                    response = await self.session.get(film)
-                    film = json.loads(await response.text())
+                    film = await self.cache.get(film)
                     films.append(f"Title: {film['title']}; ID: {str(film_num)}")
                 if len(films) != 0:
                     embed.add_field(name="Films:", value="\n".join(films))
                 residents = []
                 for resident in planet["results"][0]["residents"]:
                     resident_num = int(resident.split(r"/")[-2])
-                    response = await self.session.get(resident)
-                    resident = json.loads(await response.text())
+                    resident = await self.cache.get(resident)
                     residents.append(f"Name: {resident['name']}; ID: {str(resident_num)}")
                 if len(residents) != 0:
                     embed.add_field(name="Residents:", value="\n".join(residents))
@@ -303,10 +286,9 @@ class SW(commands.Cog):
         """Gets the info about a film by their ID"""
         if isinstance(film_id, int):
             async with ctx.typing():
-                response = await self.session.get(r"https://swapi.dev/api/films/" + str(film_id))
-                if response.status == 404:
+                film = await self.cache.get(r"https://swapi.dev/api/films/" + str(film_id))
+                if film is None:
                     return await ctx.send("Invalid Film ID.")
-                film = json.loads(await response.text())
                 embed = discord.Embed(title=f"Film: {film['title']}; Page 1/4", color=0x0000FF)
                 embed.add_field(name="ID:", value=str(film_id))
                 for key, value in film.items():
@@ -331,16 +313,14 @@ class SW(commands.Cog):
                 residents = []
                 for resident in film["characters"]:
                     resident_num = int(resident.split(r"/")[-2])
-                    response = await self.session.get(resident)
-                    resident = json.loads(await response.text())
+                    resident = await self.cache.get(resident)
                     residents.append(f"Name: {resident['name']}; ID: {str(resident_num)}")
                 if len(residents) != 0:
                     embed3.add_field(name="Characters:", value="\n".join(residents))
                 planets = []
                 for planet in film["planets"]:
                     planet_num = int(planet.split(r"/")[-2])
-                    response = await self.session.get(planet)
-                    planet = json.loads(await response.text())
+                    planet = await self.cache.get(planet)
                     planets.append(f"Name: {planet['name']}; ID: {str(planet_num)}")
                 if len(planets) != 0:
                     embed3.add_field(name="Planets:", value="\n".join(planets))
@@ -348,24 +328,21 @@ class SW(commands.Cog):
                 objects = []
                 for entry in film["starships"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed4.add_field(name="Starships:", value="\n".join(objects))
                 objects = []
                 for entry in film["vehicles"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed4.add_field(name="Vehicles:", value="\n".join(objects))
                 objects = []
                 for entry in film["species"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed4.add_field(name="Species:", value="\n".join(objects))
@@ -373,12 +350,9 @@ class SW(commands.Cog):
                 await menu(ctx, embeds, DEFAULT_CONTROLS)
         else:
             async with ctx.typing():
-                response = await self.session.get(
-                    r"https://swapi.dev/api/films/?search=" + str(film_id)
-                )
-                if response.status == 404:
+                film = await self.cache.get(r"https://swapi.dev/api/films/?search=" + str(film_id))
+                if film is None:
                     return await ctx.send("Invalid Film ID.")
-                film = json.loads(await response.text())
                 name = film["results"][0]["title"]
                 embed = discord.Embed(title=f"Film: {name}; Page 1/4", color=0x0000FF)
                 for key, value in film["results"][0].items():
@@ -403,16 +377,14 @@ class SW(commands.Cog):
                 residents = []
                 for resident in film["results"][0]["characters"]:
                     resident_num = int(resident.split(r"/")[-2])
-                    response = await self.session.get(resident)
-                    resident = json.loads(await response.text())
+                    resident = await self.cache.get(resident)
                     residents.append(f"Name: {resident['name']}; ID: {str(resident_num)}")
                 if len(residents) != 0:
                     embed3.add_field(name="Characters:", value="\n".join(residents))
                 planets = []
                 for planet in film["results"][0]["planets"]:
                     planet_num = int(planet.split(r"/")[-2])
-                    response = await self.session.get(planet)
-                    planet = json.loads(await response.text())
+                    planet = await self.cache.get(planet)
                     planets.append(f"Name: {planet['name']}; ID: {str(planet_num)}")
                 if len(planets) != 0:
                     embed3.add_field(name="Planets:", value="\n".join(planets))
@@ -420,24 +392,21 @@ class SW(commands.Cog):
                 objects = []
                 for entry in film["results"][0]["starships"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed4.add_field(name="Starships:", value="\n".join(objects))
                 objects = []
                 for entry in film["results"][0]["vehicles"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed4.add_field(name="Vehicles:", value="\n".join(objects))
                 objects = []
                 for entry in film["results"][0]["species"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed4.add_field(name="Species:", value="\n".join(objects))
@@ -449,12 +418,11 @@ class SW(commands.Cog):
         """Gets the profile of a starship by its ID"""
         if isinstance(starship_id, int):
             async with ctx.typing():
-                response = await self.session.get(
+                starship = await self.cache.get(
                     r"https://swapi.dev/api/starships/" + str(starship_id)
                 )
-                if response.status == 404:
+                if starship is None:
                     return await ctx.send("Invalid Starship ID.")
-                starship = json.loads(await response.text())
                 embed = discord.Embed(
                     title=f"Starship: {starship['name']}",
                     description=STARSHIPDESCRIPTIONS[starship["name"]],
@@ -469,28 +437,25 @@ class SW(commands.Cog):
                 objects = []
                 for entry in starship["films"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['title']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Films:", value="\n".join(objects))
                 objects = []
                 for entry in starship["pilots"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Pilots:", value="\n".join(objects))
                 await ctx.send(embed=embed)
         else:
             async with ctx.typing():
-                response = await self.session.get(
+                starship = await self.cache.get(
                     r"https://swapi.dev/api/starships/?search=" + str(starship_id)
                 )
-                if response.status == 404:
+                if starship is None:
                     return await ctx.send("Invalid Starship ID.")
-                starship = json.loads(await response.text())
                 name = starship["results"][0]["name"]
                 embed = discord.Embed(
                     title=f"Starship: {name}",
@@ -505,16 +470,14 @@ class SW(commands.Cog):
                 embed.set_image(url=STARSHIPSIMAGES[name])
                 for entry in starship["results"][0]["films"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['title']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Films:", value="\n".join(objects))
                 objects = []
                 for entry in starship["results"][0]["pilots"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Pilots:", value="\n".join(objects))
@@ -525,12 +488,11 @@ class SW(commands.Cog):
         """Gets the profile of a vehicle by its ID"""
         if isinstance(vehicle_id, int):
             async with ctx.typing():
-                response = await self.session.get(
+                vehicle = await self.cache.get(
                     r"https://swapi.dev/api/vehicles/" + str(vehicle_id)
                 )
-                if response.status == 404:
+                if vehicle is None:
                     return await ctx.send("Invalid Vehicle ID.")
-                vehicle = json.loads(await response.text())
                 embed = discord.Embed(
                     title=f"Vehicle: {vehicle['name']}",
                     description=VEHICLEDESCRIPTION[vehicle["name"]],
@@ -545,28 +507,25 @@ class SW(commands.Cog):
                 embed.set_image(url=VEHICLEIMAGE[vehicle["name"]])
                 for entry in vehicle["films"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['title']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Films:", value="\n".join(objects))
                 objects = []
                 for entry in vehicle["pilots"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Pilots:", value="\n".join(objects))
                 await ctx.send(embed=embed)
         else:
             async with ctx.typing():
-                response = await self.session.get(
+                vehicle = await self.cache.get(
                     r"https://swapi.dev/api/vehicles/?search=" + str(vehicle_id)
                 )
-                if response.status == 404:
+                if vehicle is None:
                     return await ctx.send("Invalid Vehicle ID.")
-                vehicle = json.loads(await response.text())
                 name = vehicle["results"][0]["name"]
                 embed = discord.Embed(
                     title=f"Vehicle: {name}", description=VEHICLEDESCRIPTION[name], color=0x228B22
@@ -579,16 +538,14 @@ class SW(commands.Cog):
                 embed.set_image(url=VEHICLEIMAGE[name])
                 for entry in vehicle["results"][0]["films"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['title']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Films:", value="\n".join(objects))
                 objects = []
                 for entry in vehicle["results"][0]["pilots"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Pilots:", value="\n".join(objects))
@@ -599,12 +556,9 @@ class SW(commands.Cog):
         """Gets the profile of a species by its ID"""
         if isinstance(species_id, int):
             async with ctx.typing():
-                response = await self.session.get(
-                    r"https://swapi.dev/api/species/" + str(species_id)
-                )
-                if response.status == 404:
+                species = await self.cache.get(r"https://swapi.dev/api/species/" + str(species_id))
+                if species is None:
                     return await ctx.send("Invalid Species ID.")
-                species = json.loads(await response.text())
                 embed = discord.Embed(
                     title=f"Species: {species['name']}",
                     description=SPECIESDESCRIPTION[species["name"]],
@@ -625,36 +579,32 @@ class SW(commands.Cog):
                     embed.add_field(name=key.replace("_", " ").title(), value=value.title())
                 embed.set_thumbnail(url=SPECIESTHUMBNAIL[species["name"]])
                 homeworld_num = int(species["homeworld"].split(r"/")[-2])
-                homeworld = await self.session.get(species["homeworld"])
-                homeworld = json.loads(await homeworld.text())
+                homeworld = await self.cache.get(species["homeworld"])
                 embed.add_field(
                     name="Homeworld", value=f"Name: {homeworld['name']}; ID: {str(homeworld_num)}"
                 )
                 objects = []
                 for entry in species["films"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['title']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Films:", value="\n".join(objects))
                 objects = []
                 for entry in species["people"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="People:", value="\n".join(objects))
                 await ctx.send(embed=embed)
         else:
             async with ctx.typing():
-                response = await self.session.get(
+                species = await self.cache.get(
                     r"https://swapi.dev/api/species/?search=" + str(species_id)
                 )
-                if response.status == 404:
+                if species is None:
                     return await ctx.send("Invalid Species ID.")
-                species = json.loads(await response.text())
                 name = species["results"][0]["name"]
                 embed = discord.Embed(
                     title=f"Species: {name}", description=SPECIESDESCRIPTION[name], color=0xD2B48C
@@ -674,24 +624,21 @@ class SW(commands.Cog):
                     embed.add_field(name=key.replace("_", " ").title(), value=value.title())
                 embed.set_thumbnail(url=SPECIESTHUMBNAIL[name])
                 homeworld_num = int(species["results"][0]["homeworld"].split(r"/")[-2])
-                homeworld = await self.session.get(species["results"][0]["homeworld"])
-                homeworld = json.loads(await homeworld.text())
+                homeworld = await self.cache.get(species["results"][0]["homeworld"])
                 embed.add_field(
                     name="Homeworld", value=f"Name: {homeworld['name']}; ID: {str(homeworld_num)}"
                 )
                 objects = []
                 for entry in species["results"][0]["films"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['title']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="Films:", value="\n".join(objects))
                 objects = []
                 for entry in species["results"][0]["people"]:
                     entry_num = int(entry.split(r"/")[-2])
-                    response = await self.session.get(entry)
-                    entry = json.loads(await response.text())
+                    entry = await self.cache.get(entry)
                     objects.append(f"Name: {entry['name']}; ID: {str(entry_num)}")
                 if len(objects) != 0:
                     embed.add_field(name="People:", value="\n".join(objects))
@@ -711,8 +658,7 @@ class SW(commands.Cog):
             data = []
             query = "https://swapi.dev/api/people"
             while True:
-                response = await self.session.get(query)
-                text = json.loads(await response.text())
+                text = await self.cache.get(query)
                 data_two = text["results"]
                 data += data_two
                 if bool(text["next"]):
@@ -759,8 +705,7 @@ class SW(commands.Cog):
             data = []
             query = "https://swapi.dev/api/planets"
             while True:
-                response = await self.session.get(query)
-                text = json.loads(await response.text())
+                text = await self.cache.get(query)
                 data_two = text["results"]
                 data += data_two
                 if bool(text["next"]):
@@ -802,8 +747,7 @@ class SW(commands.Cog):
             data = []
             query = "https://swapi.dev/api/films"
             while True:
-                response = await self.session.get(query)
-                text = json.loads(await response.text())
+                text = await self.cache.get(query)
                 data_two = text["results"]
                 data += data_two
                 if bool(text["next"]):
@@ -850,8 +794,7 @@ class SW(commands.Cog):
             data = []
             query = "https://swapi.dev/api/starships"
             while True:
-                response = await self.session.get(query)
-                text = json.loads(await response.text())
+                text = await self.cache.get(query)
                 data_two = text["results"]
                 data += data_two
                 if bool(text["next"]):
@@ -887,8 +830,7 @@ class SW(commands.Cog):
             data = []
             query = "https://swapi.dev/api/vehicles"
             while True:
-                response = await self.session.get(query)
-                text = json.loads(await response.text())
+                text = await self.cache.get(query)
                 data_two = text["results"]
                 data += data_two
                 if bool(text["next"]):
@@ -924,8 +866,7 @@ class SW(commands.Cog):
             data = []
             query = "https://swapi.dev/api/species"
             while True:
-                response = await self.session.get(query)
-                text = json.loads(await response.text())
+                text = await self.cache.get(query)
                 data_two = text["results"]
                 data += data_two
                 if bool(text["next"]):